@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import asyncio
+import time
+
+from .tracing import record_span
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Bounds concurrent webhook processing: `max_in_flight` run, up to `max_queue` wait.
+
+    Anything beyond that (or waiting longer than `queue_timeout_s`) is shed with
+    Overloaded, which the webhook handlers turn into 503 + Retry-After.
+    """
+
+    def __init__(self, max_in_flight: int = 4, max_queue: int = 32, queue_timeout_s: float = 30.0, retry_after_s: int = 60):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after_s = retry_after_s
+        self._sem = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._shed_queue_full = 0
+        self._shed_timeout = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        t0 = time.perf_counter()
+        try:
+            await self._acquire()
+        finally:
+            # Inside a trace, queueing shows up apart from the work it delayed (shed or not).
+            record_span("admission.wait", t0, time.perf_counter() - t0)
+
+        self._in_flight += 1
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._sem.release()
+
+    async def _acquire(self) -> None:
+        if not self._sem.locked():
+            await self._sem.acquire()  # free slot: returns without suspending
+        elif self._waiting >= self.max_queue:
+            self._shed_queue_full += 1
+            raise Overloaded("Queue full", self.retry_after_s)
+        else:
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout_s)
+            except asyncio.TimeoutError:
+                self._shed_timeout += 1
+                raise Overloaded("Timed out waiting for a processing slot", self.retry_after_s)
+            finally:
+                self._waiting -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "shed": self._shed_queue_full + self._shed_timeout,
+            "shed_queue_full": self._shed_queue_full,
+            "shed_timeout": self._shed_timeout,
+        }
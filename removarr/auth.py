@@ -5,8 +5,12 @@ import hashlib
 import hmac
 import os
 import secrets
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from ipaddress import IPv4Network, IPv6Network, ip_address, ip_network
 
 from sqlalchemy.orm import Session
 from sqlalchemy import select, delete
@@ -52,11 +56,10 @@ def create_admin(db: Session, username: str, password: str) -> None:
     db.add(user)
     db.commit()
 
-def login(db: Session, username: str, password: str) -> str:
-    row = db.execute(select(AdminUser).where(AdminUser.username == username)).scalars().first()
-    if not row or not verify_password(password, row.password_hash):
-        raise ValueError("Invalid credentials")
+def get_password_hash(db: Session, username: str) -> str | None:
+    return db.execute(select(AdminUser.password_hash).where(AdminUser.username == username)).scalars().first()
 
+def create_session(db: Session) -> str:
     token = secrets.token_urlsafe(48)
     now = datetime.now(timezone.utc)
     exp = now + timedelta(days=SESSION_DAYS)
@@ -87,3 +90,72 @@ def validate_session(db: Session, token: str) -> bool:
         db.commit()
         return False
     return True
+
+class LoginThrottle:
+    """Locks out a key (a client address) after too many failed logins."""
+
+    def __init__(self, max_failures: int = 5, window_s: int = 900, lockout_s: int = 300, max_keys: int = 10_000):
+        self._max_failures = max_failures
+        self._window_s = window_s
+        self._lockout_s = lockout_s
+        self._max_keys = max_keys
+        self._failures: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        horizon = now - max(self._window_s, self._lockout_s)
+        for k in [k for k, d in self._failures.items() if not d or d[-1] < horizon]:
+            del self._failures[k]
+
+    def retry_after(self, key: str) -> int:
+        """Seconds until `key` may try again; 0 if it is not locked out."""
+        now = time.monotonic()
+        with self._lock:
+            d = self._failures.get(key)
+            if not d:
+                return 0
+            while d and d[0] < now - self._window_s:
+                d.popleft()
+            wait = d[-1] + self._lockout_s - now if len(d) >= self._max_failures else 0.0
+        return int(wait) + 1 if wait > 0 else 0
+
+    def failure(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failures) >= self._max_keys:
+                self._prune(now)
+            self._failures.setdefault(key, deque(maxlen=self._max_failures)).append(now)
+
+    def success(self, key: str) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+
+def trusted_networks(specs: list[str]) -> list[IPv4Network | IPv6Network]:
+    """Parse REMOVARR_TRUSTED_PROXIES entries (addresses or CIDRs); invalid entries raise."""
+    return [ip_network(x.strip(), strict=False) for x in specs if x.strip()]
+
+def _is_trusted(addr: str, trusted: list[IPv4Network | IPv6Network]) -> bool:
+    try:
+        ip = ip_address(addr)
+    except ValueError:
+        return False
+    return any(ip in net for net in trusted)
+
+def client_address(peer: str | None, forwarded: str | None, trusted: list[IPv4Network | IPv6Network]) -> str:
+    """The address a request is attributed to.
+
+    `forwarded` (an X-Forwarded-For style list) is only believed when the direct peer
+    is a trusted proxy, and is read right to left, skipping further trusted hops, so a
+    client can't choose its own address by sending the header itself.
+    """
+    addr = peer or "?"
+    if not forwarded or not _is_trusted(addr, trusted):
+        return addr
+    for hop in reversed(forwarded.split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        addr = hop
+        if not _is_trusted(hop, trusted):
+            break
+    return addr
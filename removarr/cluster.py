@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Optional, Sequence, TypeVar
+import hashlib
+
+import requests
+
+CLUSTER_HEADER = "X-Removarr-Cluster-Token"
+SHARD_PATH = "/internal/cluster/process"
+
+_A = TypeVar("_A")
+
+class ShardNotRun(Exception):
+    """The owner never processed the shard (unreachable or shedding load), so it is safe to run it elsewhere."""
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hashing over node names; adding or removing a node moves ~1/N of the keys."""
+
+    def __init__(self, nodes: Sequence[str], vnodes: int = 64):
+        self.nodes = sorted(set(nodes))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._keys = [h for h, _ in points]
+        self._owners = [n for _, n in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        i = bisect_right(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[i]
+
+class Cluster:
+    """Optional multi-node mode: Plex accounts are sharded across Removarr nodes.
+
+    Every node must share the database and REMOVARR_SECRET_KEY. The node that receives a
+    webhook coordinates: it scans its own shard and sends the other shards' account ids
+    to their owners, then merges the results.
+    """
+
+    def __init__(
+        self,
+        self_url: Optional[str],
+        nodes: Sequence[str],
+        token: Optional[str],
+        timeout_s: float = 120.0,
+        connect_timeout_s: float = 5.0,
+        vnodes: int = 64,
+    ):
+        self.self_url = (self_url or "").rstrip("/")
+        self.token = token or ""
+        self.timeout_s = timeout_s
+        self.connect_timeout_s = connect_timeout_s
+        members = {n.rstrip("/") for n in nodes if n}
+        if self.self_url:
+            members.add(self.self_url)
+        self.ring = HashRing(sorted(members), vnodes=vnodes)
+        self._session = requests.Session()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.self_url and self.token and len(self.ring.nodes) > 1)
+
+    def owner(self, account_id: int) -> str:
+        if not self.enabled:
+            return self.self_url
+        return self.ring.owner(f"account:{account_id}") or self.self_url
+
+    def is_local(self, account_id: int) -> bool:
+        return self.owner(account_id) == self.self_url
+
+    def partition(self, accounts: Sequence[_A], key=lambda a: a.id) -> dict[str, list[_A]]:
+        shards: dict[str, list[_A]] = {}
+        for acc in accounts:
+            shards.setdefault(self.owner(key(acc)), []).append(acc)
+        return shards
+
+    def process_remote(self, node: str, payload: dict) -> dict:
+        """Run a shard on its owner.
+
+        Raises ShardNotRun when the owner can't be reached or answers 503. Any other
+        error (notably a read timeout) means the owner may have done the work.
+        """
+        try:
+            r = self._session.post(
+                f"{node}{SHARD_PATH}",
+                json=payload,
+                headers={CLUSTER_HEADER: self.token},
+                timeout=(self.connect_timeout_s, self.timeout_s),
+            )
+        except requests.ConnectionError as e:  # includes ConnectTimeout, not ReadTimeout
+            raise ShardNotRun(f"unreachable: {e}") from e
+        if r.status_code == 503:
+            raise ShardNotRun(f"overloaded (503): {r.text[:200]}")
+        r.raise_for_status()
+        return r.json()
+
+    def close(self) -> None:
+        self._session.close()
@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import BaseModel, Field, model_validator
+
+class PlexServerSetting(BaseModel):
+    name: str
+    url: str
+    token: str
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=None, extra="ignore")
@@ -14,10 +21,75 @@ class Settings(BaseSettings):
 
     # Database
     db_url: str = Field("sqlite:///./data/removarr.db", alias="REMOVARR_DB_URL")
+    db_async: bool = Field(False, alias="REMOVARR_DB_ASYNC")  # requires aiosqlite
+    sqlite_synchronous: str = Field("NORMAL", alias="REMOVARR_SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(5000, alias="REMOVARR_SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_cache_kb: int = Field(16384, alias="REMOVARR_SQLITE_CACHE_KB")
 
     # Optional Plex server verification
     verify_in_plex: bool = Field(False, alias="REMOVARR_VERIFY_IN_PLEX")
     plex_base_url: str | None = Field(None, alias="PLEX_BASE_URL")
     plex_server_token: str | None = Field(None, alias="PLEX_SERVER_TOKEN")
+    # Additional servers as JSON: [{"name": "4k", "url": "http://plex4k:32400", "token": "..."}]
+    plex_servers: list[PlexServerSetting] = Field(default_factory=list, alias="PLEX_SERVERS")
+    plex_server_timeout_s: float = Field(10.0, alias="REMOVARR_PLEX_SERVER_TIMEOUT_S")
+
+    # Plex Discover watchlist paging (entries fetched per request)
+    watchlist_page_size: int = Field(50, alias="REMOVARR_WATCHLIST_PAGE_SIZE")
+
+    # Dedicated crypto workers (PBKDF2 process pool, Fernet thread pool)
+    hash_workers: int = Field(1, alias="REMOVARR_HASH_WORKERS")
+    crypto_threads: int = Field(2, alias="REMOVARR_CRYPTO_THREADS")
+    login_max_pending: int = Field(4, alias="REMOVARR_LOGIN_MAX_PENDING")
+
+    # Login throttling: lock out a client address after N failures within the window
+    login_max_failures: int = Field(5, alias="REMOVARR_LOGIN_MAX_FAILURES")
+    login_window_s: int = Field(900, alias="REMOVARR_LOGIN_WINDOW_S")
+    login_lockout_s: int = Field(300, alias="REMOVARR_LOGIN_LOCKOUT_S")
+    # Reverse proxies (JSON list of addresses/CIDRs) whose forwarded-for header names the client
+    trusted_proxies: list[str] = Field(default_factory=list, alias="REMOVARR_TRUSTED_PROXIES")
+    forwarded_header: str = Field("X-Forwarded-For", alias="REMOVARR_FORWARDED_HEADER")
+
+    # Grab prefetch: find watchlist entries on Grab so the Download removes them directly
+    prefetch_on_grab: bool = Field(True, alias="REMOVARR_PREFETCH_ON_GRAB")
+    prefetch_ttl_s: int = Field(60 * 60 * 12, alias="REMOVARR_PREFETCH_TTL_S")
+    # Separate, smaller limits than imports: a burst of Grabs must never push Downloads into 503
+    prefetch_max_in_flight: int = Field(1, alias="REMOVARR_PREFETCH_MAX_IN_FLIGHT")
+    prefetch_max_queue: int = Field(16, alias="REMOVARR_PREFETCH_MAX_QUEUE")
+
+    # Webhook admission control: concurrent _process runs, waiting requests, and backoff hint
+    webhook_max_in_flight: int = Field(4, alias="REMOVARR_WEBHOOK_MAX_IN_FLIGHT")
+    webhook_max_queue: int = Field(32, alias="REMOVARR_WEBHOOK_MAX_QUEUE")
+    webhook_queue_timeout_s: float = Field(30.0, alias="REMOVARR_WEBHOOK_QUEUE_TIMEOUT_S")
+    webhook_retry_after_s: int = Field(60, alias="REMOVARR_WEBHOOK_RETRY_AFTER_S")
+
+    # Cluster mode: shard accounts across nodes that share the database and secret key.
+    # Nodes as JSON list of base URLs, e.g. ["http://removarr-a:8765", "http://removarr-b:8765"]
+    cluster_nodes: list[str] = Field(default_factory=list, alias="REMOVARR_CLUSTER_NODES")
+    cluster_self: str | None = Field(None, alias="REMOVARR_CLUSTER_SELF")
+    cluster_token: str | None = Field(None, alias="REMOVARR_CLUSTER_TOKEN")
+    cluster_timeout_s: float = Field(120.0, alias="REMOVARR_CLUSTER_TIMEOUT_S")
+    cluster_connect_timeout_s: float = Field(5.0, alias="REMOVARR_CLUSTER_CONNECT_TIMEOUT_S")
+
+    # Diagnostics: number of slowest request traces kept in memory (0 disables)
+    trace_keep: int = Field(25, alias="REMOVARR_TRACE_KEEP")
+
+    @model_validator(mode="after")
+    def _unique_server_names(self) -> "Settings":
+        # PlexOps keys connections and stats by name; a duplicate would silently replace a server.
+        names = [srv.name for srv in self.all_plex_servers()]
+        dupes = sorted({n for n in names if names.count(n) > 1})
+        if dupes:
+            raise ValueError(f"Duplicate Plex server name(s): {', '.join(dupes)}")
+        return self
+
+    def all_plex_servers(self) -> list[PlexServerSetting]:
+        servers = list(self.plex_servers)
+        if self.plex_base_url and self.plex_server_token:
+            servers.insert(0, PlexServerSetting(name="default", url=self.plex_base_url, token=self.plex_server_token))
+        return servers
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    # Read on first use (app startup), so importing the package needs no environment.
+    return Settings()
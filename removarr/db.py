@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 class Base(DeclarativeBase):
@@ -14,10 +14,58 @@ def _ensure_sqlite_dir(db_url: str) -> None:
         if directory and directory != ".":
             os.makedirs(directory, exist_ok=True)
 
-def make_engine(db_url: str):
+def _is_file_sqlite(db_url: str) -> bool:
+    return db_url.startswith("sqlite") and ":memory:" not in db_url and not db_url.rstrip("/").endswith("sqlite:")
+
+_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+def _install_sqlite_pragmas(engine, wal: bool, synchronous: str, busy_timeout_ms: int, cache_kb: int) -> None:
+    synchronous = synchronous.upper()
+    if synchronous not in _SYNCHRONOUS_MODES:
+        raise ValueError(f"Invalid SQLite synchronous mode: {synchronous!r}")
+
+    # WAL lets UI reads proceed while a webhook or the status checker is writing;
+    # synchronous=NORMAL is durable in WAL mode and avoids an fsync per commit.
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            if wal:
+                cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute(f"PRAGMA synchronous={synchronous}")
+            cur.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            cur.execute(f"PRAGMA cache_size={-int(cache_kb)}")
+            cur.execute("PRAGMA temp_store=MEMORY")
+        finally:
+            cur.close()
+
+def make_engine(db_url: str, *, synchronous: str = "NORMAL", busy_timeout_ms: int = 5000, cache_kb: int = 16384):
     _ensure_sqlite_dir(db_url)
     connect_args = {"check_same_thread": False} if db_url.startswith("sqlite") else {}
-    return create_engine(db_url, future=True, pool_pre_ping=True, connect_args=connect_args)
+    engine = create_engine(db_url, future=True, pool_pre_ping=True, connect_args=connect_args)
+    if db_url.startswith("sqlite"):
+        _install_sqlite_pragmas(engine, _is_file_sqlite(db_url), synchronous, busy_timeout_ms, cache_kb)
+    return engine
 
 def make_session_factory(engine):
     return sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+def _async_url(db_url: str) -> str:
+    if db_url.startswith("sqlite://") and not db_url.startswith("sqlite+"):
+        return "sqlite+aiosqlite://" + db_url[len("sqlite://"):]
+    return db_url
+
+def make_async_engine(db_url: str, *, synchronous: str = "NORMAL", busy_timeout_ms: int = 5000, cache_kb: int = 16384):
+    # Imported lazily: aiosqlite is only needed when REMOVARR_DB_ASYNC is enabled.
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    _ensure_sqlite_dir(db_url)
+    engine = create_async_engine(_async_url(db_url), pool_pre_ping=True)
+    if db_url.startswith("sqlite"):
+        _install_sqlite_pragmas(engine.sync_engine, _is_file_sqlite(db_url), synchronous, busy_timeout_ms, cache_kb)
+    return engine
+
+def make_async_session_factory(engine):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
@@ -1,10 +1,14 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from collections import deque
-from typing import Deque, List, Dict, Any
-import time
+from itertools import islice
+from typing import Deque, Optional
+import secrets
+import threading
 
-@dataclass
+import orjson
+
+@dataclass(slots=True)
 class LogItem:
     ts: float
     source: str
@@ -16,25 +20,50 @@ class LogItem:
     scanned_accounts: int
     details: list[str]
 
+    def to_json(self, seq: int) -> bytes:
+        return orjson.dumps({
+            "seq": seq,
+            "ts": self.ts,
+            "source": self.source,
+            "title": self.title,
+            "year": self.year,
+            "tmdb_id": self.tmdb_id,
+            "tvdb_id": self.tvdb_id,
+            "removed": self.removed,
+            "scanned_accounts": self.scanned_accounts,
+            "details": self.details,
+        })
+
 class LogRing:
+    """Newest-first ring of webhook events, stored as already-serialized JSON.
+
+    Every entry is encoded once in add(). `version` is the seq of the newest entry;
+    read() returns only entries newer than `since`, and the full snapshot is cached
+    until the next add(). `epoch` changes on restart, when seqs start over, so a
+    `since` is only meaningful together with the epoch it came from.
+    """
+
     def __init__(self, maxlen: int = 200):
-        self._d: Deque[LogItem] = deque(maxlen=maxlen)
+        self.maxlen = maxlen
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self._d: Deque[bytes] = deque(maxlen=maxlen)
+        self._snapshot: Optional[bytes] = None
+        self._lock = threading.Lock()
 
     def add(self, item: LogItem) -> None:
-        self._d.appendleft(item)
-
-    def list(self) -> list[dict]:
-        out: list[dict] = []
-        for x in list(self._d):
-            out.append({
-                "ts": x.ts,
-                "source": x.source,
-                "title": x.title,
-                "year": x.year,
-                "tmdb_id": x.tmdb_id,
-                "tvdb_id": x.tvdb_id,
-                "removed": x.removed,
-                "scanned_accounts": x.scanned_accounts,
-                "details": x.details,
-            })
-        return out
+        with self._lock:
+            self.version += 1
+            self._d.appendleft(item.to_json(self.version))
+            self._snapshot = None
+
+    def read(self, since: Optional[int] = None, epoch: Optional[str] = None) -> tuple[int, bool, bytes]:
+        """-> (version, reset, JSON array). reset means the array replaces the caller's copy."""
+        with self._lock:
+            version = self.version
+            if since is not None and epoch == self.epoch and 0 <= version - since <= len(self._d):
+                return version, False, b"[" + b",".join(islice(self._d, version - since)) + b"]"
+            # no `since`, another epoch (restart) or a gap (entries fell off the ring)
+            if self._snapshot is None:
+                self._snapshot = b"[" + b",".join(self._d) + b"]"
+            return version, True, self._snapshot
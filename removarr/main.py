@@ -1,46 +1,52 @@
 from __future__ import annotations
 
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Optional, Sequence, TypeVar
 import time
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 import asyncio
+import hmac
 import secrets
 
-from fastapi import FastAPI, Depends, HTTPException, Header, Request, Response, Cookie
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+import orjson
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Header, Request, Response, Cookie
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import select, delete, update
 
-from .config import settings
-from .db import Base, make_engine, make_session_factory
-from .models import PlexAccount, AppSetting
-from .crypto import Crypto
+from .config import Settings, get_settings
+from .models import PlexAccount, AppSetting, PendingRemoval, ConsumedMedia
 from .schemas import (
     AccountCreate, AccountOut, WebhookResult, SetupAdmin, LoginReq,
-    OAuthStartReq, OAuthStartRes, OAuthStatusRes
+    OAuthStartReq, OAuthStartRes, OAuthStatusRes, ArrEvent, RadarrWebhook, SonarrWebhook, ShardProcessReq,
 )
-from .plex_client import PlexOps
-from .logring import LogRing, LogItem
-from .auth import COOKIE_NAME, has_admin, create_admin, login as do_login, logout as do_logout, validate_session
-from .plex_oauth import PlexOAuthManager
-
-engine = make_engine(settings.db_url)
-SessionLocal = make_session_factory(engine)
-Base.metadata.create_all(bind=engine)
+from .logring import LogItem
+from .auth import (
+    COOKIE_NAME, has_admin, create_admin, get_password_hash, create_session,
+    logout as do_logout, validate_session, client_address,
+)
+from .workers import Busy
+from .admission import Overloaded
+from .runtime import Runtime
+from .cluster import SHARD_PATH, ShardNotRun
+from .tracing import ProfileCapture, span, pstats_bytes, pstats_text
 
-crypto = Crypto(settings.secret_key)
-plex_ops = PlexOps(settings.plex_base_url, settings.plex_server_token)
-logring = LogRing(maxlen=400)
-oauth_mgr = PlexOAuthManager()
+# cProfile allows one active profiler per thread, so this one is process-wide.
+profile_capture = ProfileCapture()
 
 STATIC_DIR = Path(__file__).parent / "static"
-app = FastAPI(title="Removarr", version="0.4.11")
+router = APIRouter()
+
+def get_rt(request: Request) -> Runtime:
+    # Per-app resources; built by create_app() and started in its lifespan.
+    return request.app.state.rt
 
 # ---- DB helpers ----
-def get_db():
-    db = SessionLocal()
+def get_db(rt: Runtime = Depends(get_rt)):
+    db = rt.SessionLocal()
     try:
         yield db
     finally:
@@ -67,11 +73,17 @@ def require_auth(
 def require_webhook(
     x_removarr_webhook_token: Optional[str] = Header(None),
     db: Session = Depends(get_db),
+    rt: Runtime = Depends(get_rt),
 ):
-    current = get_setting(db, "webhook_token") or settings.webhook_token
+    current = get_setting(db, "webhook_token") or rt.settings.webhook_token
     if x_removarr_webhook_token != current:
         raise HTTPException(status_code=401, detail="Unauthorized (webhook token)")
 
+def require_cluster(x_removarr_cluster_token: Optional[str] = Header(None), rt: Runtime = Depends(get_rt)):
+    given = (x_removarr_cluster_token or "").encode("utf-8")
+    if not rt.cluster.enabled or not hmac.compare_digest(given, rt.cluster.token.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Unauthorized (cluster token)")
+
 def _dt_to_iso(dt: datetime | None) -> str | None:
     if not dt:
         return None
@@ -91,9 +103,9 @@ def _account_out(a: PlexAccount) -> AccountOut:
         last_error=getattr(a, "last_error", None),
     )
 
-@app.get("/health")
-def health():
-    return {"ok": True, "verify_in_plex": settings.verify_in_plex}
+@router.get("/health")
+def health(rt: Runtime = Depends(get_rt)):
+    return {"ok": True, "verify_in_plex": rt.settings.verify_in_plex}
 
 def get_setting(db: Session, key: str) -> Optional[str]:
     row = db.execute(select(AppSetting).where(AppSetting.key == key)).scalars().first()
@@ -109,23 +121,36 @@ def set_setting(db: Session, key: str, value: str) -> None:
     db.commit()
 
 # ---- Auth ----
-@app.get("/api/auth/status")
+@router.get("/api/auth/status")
 def auth_status(db: Session = Depends(get_db)):
     return {"has_admin": has_admin(db)}
 
-@app.post("/api/auth/setup")
+@router.post("/api/auth/setup")
 def auth_setup(payload: SetupAdmin, db: Session = Depends(get_db)):
     try:
         create_admin(db, payload.username, payload.password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"ok": True, "token": token}
-@app.post("/api/auth/login")
-def auth_login(payload: LoginReq, response: Response, db: Session = Depends(get_db)):
+@router.post("/api/auth/login")
+async def auth_login(payload: LoginReq, request: Request, response: Response, rt: Runtime = Depends(get_rt)):
+    # Keyed on the client address only: a per-username lockout would let anyone lock the admin out.
+    peer = request.client.host if request.client else None
+    key = f"ip:{client_address(peer, request.headers.get(rt.settings.forwarded_header), rt.trusted_proxies)}"
+    wait = rt.login_throttle.retry_after(key)
+    if wait:
+        raise HTTPException(status_code=429, detail="Too many failed logins", headers={"Retry-After": str(wait)})
+
+    stored = await _run_db(rt, get_password_hash, payload.username)
     try:
-        token = do_login(db, payload.username, payload.password)
-    except ValueError as e:
-        raise HTTPException(status_code=401, detail=str(e))
+        ok = bool(stored) and await rt.crypto_pool.verify_password(payload.password, stored)
+    except Busy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    if not ok:
+        rt.login_throttle.failure(key)
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    rt.login_throttle.success(key)
+    token = await _run_db(rt, create_session)
 
     response.set_cookie(
         key=COOKIE_NAME,
@@ -137,7 +162,7 @@ def auth_login(payload: LoginReq, response: Response, db: Session = Depends(get_
         path="/",
     )
     return {"ok": True, "token": token}
-@app.post("/api/auth/logout", dependencies=[Depends(require_auth)])
+@router.post("/api/auth/logout", dependencies=[Depends(require_auth)])
 def auth_logout(response: Response, removarr_session: Optional[str] = Cookie(default=None), db: Session = Depends(get_db)):
     if removarr_session:
         do_logout(db, removarr_session)
@@ -145,20 +170,20 @@ def auth_logout(response: Response, removarr_session: Optional[str] = Cookie(def
     return {"ok": True, "token": token}
 
 
-@app.get("/api/auth/ping", dependencies=[Depends(require_auth)])
+@router.get("/api/auth/ping", dependencies=[Depends(require_auth)])
 def auth_ping():
     return {"ok": True}
 
 # ---- Plex OAuth connect ----
-@app.post("/api/plex/oauth/start", response_model=OAuthStartRes, dependencies=[Depends(require_auth)])
-def plex_oauth_start(payload: OAuthStartReq):
+@router.post("/api/plex/oauth/start", response_model=OAuthStartRes, dependencies=[Depends(require_auth)])
+def plex_oauth_start(payload: OAuthStartReq, rt: Runtime = Depends(get_rt)):
     flow_id = secrets.token_urlsafe(16)
-    url = oauth_mgr.start(flow_id)
+    url = rt.oauth_mgr.start(flow_id)
     return OAuthStartRes(flow_id=flow_id, url=url)
 
-@app.get("/api/plex/oauth/status/{flow_id}", response_model=OAuthStatusRes, dependencies=[Depends(require_auth)])
-def plex_oauth_status(flow_id: str, db: Session = Depends(get_db)):
-    status, token = oauth_mgr.poll(flow_id)
+@router.get("/api/plex/oauth/status/{flow_id}", response_model=OAuthStatusRes, dependencies=[Depends(require_auth)])
+def plex_oauth_status(flow_id: str, db: Session = Depends(get_db), rt: Runtime = Depends(get_rt)):
+    status, token = rt.oauth_mgr.poll(flow_id)
     if status == "pending":
         return OAuthStatusRes(flow_id=flow_id, status="pending")
     if status == "expired":
@@ -168,7 +193,7 @@ def plex_oauth_status(flow_id: str, db: Session = Depends(get_db)):
 
     # status == ok => token received
     assert token is not None
-    ok, msg = plex_ops.validate_user_token(token)
+    ok, msg = rt.plex_ops.validate_user_token(token)
     if not ok:
         return OAuthStatusRes(flow_id=flow_id, status="error", message=f"Token received but validation failed: {msg}")
 
@@ -180,7 +205,7 @@ def plex_oauth_status(flow_id: str, db: Session = Depends(get_db)):
 
     acc = PlexAccount(
         label=label,
-        token_enc=crypto.encrypt(token),
+        token_enc=rt.crypto.encrypt(token),
         auth_method="oauth",
         status="ok",
         last_check_at=datetime.now(timezone.utc),
@@ -193,8 +218,8 @@ def plex_oauth_status(flow_id: str, db: Session = Depends(get_db)):
     return OAuthStatusRes(flow_id=flow_id, status="ok", account_id=acc.id, label=acc.label)
 
 # ---- Protected API ----
-@app.get("/api/info", dependencies=[Depends(require_auth)])
-def info():
+@router.get("/api/info", dependencies=[Depends(require_auth)])
+def info(rt: Runtime = Depends(get_rt)):
     return {
         "webhook": {
             "radarr_path": "/webhook/radarr",
@@ -203,41 +228,55 @@ def info():
             "recommended_sonarr_event": "On Import Complete",
             "recommended_radarr_event": "On Import Complete",
         },
-        "verify_in_plex": settings.verify_in_plex,
-        "plex_base_url_set": bool(settings.plex_base_url),
-        "plex_server_token_set": bool(settings.plex_server_token),
+        "verify_in_plex": rt.settings.verify_in_plex,
+        "plex_base_url_set": bool(rt.settings.plex_base_url),
+        "plex_server_token_set": bool(rt.settings.plex_server_token),
+        "plex_servers": [c.name for c in rt.plex_ops.servers],
     }
 
 
-@app.get("/api/settings/webhook-token", dependencies=[Depends(require_auth)])
-def get_webhook_token(db: Session = Depends(get_db)):
-    token = get_setting(db, "webhook_token") or settings.webhook_token
+@router.get("/api/settings/webhook-token", dependencies=[Depends(require_auth)])
+def get_webhook_token(db: Session = Depends(get_db), rt: Runtime = Depends(get_rt)):
+    token = get_setting(db, "webhook_token") or rt.settings.webhook_token
     source = "db" if get_setting(db, "webhook_token") else "env"
     return {"token": token, "source": source}
 
-@app.post("/api/settings/webhook-token/regenerate", dependencies=[Depends(require_auth)])
+@router.post("/api/settings/webhook-token/regenerate", dependencies=[Depends(require_auth)])
 def regenerate_webhook_token(db: Session = Depends(get_db)):
     token = secrets.token_urlsafe(32)
     set_setting(db, "webhook_token", token)
     return {"token": token}
 
-@app.get("/api/logs", dependencies=[Depends(require_auth)])
-def logs():
-    return {"items": logring.list()}
+@router.get("/api/logs", dependencies=[Depends(require_auth)])
+def logs(request: Request, since: Optional[int] = None, epoch: Optional[str] = None, rt: Runtime = Depends(get_rt)):
+    logring = rt.logring
+    # Dashboards poll this; an unchanged log is a 304, a changed one only sends new entries.
+    etag = f'"{logring.epoch}-{logring.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    version, reset, items = logring.read(since, epoch)
+    body = b'{"epoch":"%s","version":%d,"maxlen":%d,"reset":%s,"items":%s}' % (
+        logring.epoch.encode(), version, logring.maxlen, b"true" if reset else b"false", items,
+    )
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": f'"{logring.epoch}-{version}"', "Cache-Control": "no-cache"},
+    )
 
-@app.get("/api/accounts", response_model=list[AccountOut], dependencies=[Depends(require_auth)])
+@router.get("/api/accounts", response_model=list[AccountOut], dependencies=[Depends(require_auth)])
 def list_accounts(db: Session = Depends(get_db)):
     rows = db.execute(select(PlexAccount).order_by(PlexAccount.id.asc())).scalars().all()
     return [_account_out(r) for r in rows]
 
-@app.post("/api/accounts", response_model=AccountOut, dependencies=[Depends(require_auth)])
-def add_account(payload: AccountCreate, db: Session = Depends(get_db)):
+@router.post("/api/accounts", response_model=AccountOut, dependencies=[Depends(require_auth)])
+def add_account(payload: AccountCreate, db: Session = Depends(get_db), rt: Runtime = Depends(get_rt)):
     # Manual token
-    ok, msg = plex_ops.validate_user_token(payload.plex_token)
+    ok, msg = rt.plex_ops.validate_user_token(payload.plex_token)
     if not ok:
         raise HTTPException(status_code=400, detail=f"Invalid Plex token: {msg}")
 
-    token_enc = crypto.encrypt(payload.plex_token)
+    token_enc = rt.crypto.encrypt(payload.plex_token)
     acc = PlexAccount(
         label=payload.label,
         token_enc=token_enc,
@@ -256,7 +295,7 @@ def add_account(payload: AccountCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"Failed to add account: {e}")
     return _account_out(acc)
 
-@app.delete("/api/accounts/{account_id}", dependencies=[Depends(require_auth)])
+@router.delete("/api/accounts/{account_id}", dependencies=[Depends(require_auth)])
 def delete_account(account_id: int, db: Session = Depends(get_db)):
     res = db.execute(delete(PlexAccount).where(PlexAccount.id == account_id))
     db.commit()
@@ -264,49 +303,139 @@ def delete_account(account_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Not found")
     return {"deleted": True}
 
-def _get_accounts(db: Session):
-    return db.execute(select(PlexAccount)).scalars().all()
-
-def _mark_account_error(db: Session, acc_id: int, error: str):
-    db.execute(
-        update(PlexAccount)
-        .where(PlexAccount.id == acc_id)
-        .values(status="invalid", last_error=error[:1000], last_check_at=datetime.now(timezone.utc))
-    )
-    db.commit()
-
-def _mark_account_ok(db: Session, acc_id: int):
+async def _run_db(rt: Runtime, fn, *args):
+    # Runs a sync Session helper on the async engine when enabled, else on a regular
+    # session in a worker thread: a busy_timeout wait must not stall the event loop.
+    if rt.AsyncSessionLocal is not None:
+        async with rt.AsyncSessionLocal() as adb:
+            return await adb.run_sync(fn, *args)
+    return await asyncio.to_thread(_with_session, rt.SessionLocal, fn, *args)
+
+def _with_session(session_factory, fn, *args):
+    with session_factory() as db:
+        return fn(db, *args)
+
+def _get_accounts(db: Session, ids: Optional[Sequence[int]] = None):
+    with span("db.get_accounts"):
+        q = select(PlexAccount)
+        if ids is not None:
+            q = q.where(PlexAccount.id.in_(ids))
+        return db.execute(q).scalars().all()
+
+def _status_error(error: str) -> dict:
+    return {"status": "invalid", "last_error": error[:1000], "last_check_at": datetime.now(timezone.utc)}
+
+def _status_ok() -> dict:
     now = datetime.now(timezone.utc)
-    db.execute(
-        update(PlexAccount)
-        .where(PlexAccount.id == acc_id)
-        .values(status="ok", last_error=None, last_check_at=now, last_ok_at=now)
-    )
-    db.commit()
+    return {"status": "ok", "last_error": None, "last_check_at": now, "last_ok_at": now}
 
-def _process(source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int], db: Session) -> WebhookResult:
-    accounts = _get_accounts(db)
+def _write_account_status(db: Session, updates: dict[int, dict]) -> None:
+    # One transaction (and one fsync) for a whole pass instead of one per account.
+    if not updates:
+        return
+    with span("db.write_account_status"):
+        db.execute(update(PlexAccount), [{"id": acc_id, **values} for acc_id, values in updates.items()])
+        db.commit()
 
-    if settings.verify_in_plex:
-        ok_lib = plex_ops.is_available_in_library(tmdb_id=tmdb_id, tvdb_id=tvdb_id, title=title, year=year)
+async def _process(rt: Runtime, source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> WebhookResult:
+    # Trace first, so time spent queued for a slot (and sheds) show up as admission.wait.
+    with rt.trace_store.trace(f"webhook.{source}", title=title, year=year, tmdb_id=tmdb_id, tvdb_id=tvdb_id) as tr:
+        try:
+            async with rt.admission.slot():
+                res = await _process_traced(rt, source, tmdb_id, tvdb_id, title, year)
+        except Overloaded as e:
+            tr.attrs["shed"] = str(e)
+            # 503 + Retry-After makes Radarr/Sonarr back off and redeliver later.
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        tr.attrs["scanned_accounts"] = res.scanned_accounts
+        tr.attrs["removed"] = res.removed
+        return res
+
+async def _process_traced(rt: Runtime, source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> WebhookResult:
+    accounts = await _run_db(rt, _get_accounts)
+
+    if rt.settings.verify_in_plex:
+        ok_lib = await asyncio.to_thread(
+            rt.plex_ops.is_available_in_library, tmdb_id=tmdb_id, tvdb_id=tvdb_id, title=title, year=year
+        )
         if not ok_lib:
             res = WebhookResult(removed=0, scanned_accounts=len(accounts), details=[f"Skipped: not found in Plex library (verify enabled) for {title} ({year})"])
-            logring.add(LogItem(ts=time.time(), source=source, title=title, year=year, tmdb_id=tmdb_id, tvdb_id=tvdb_id,
+            rt.logring.add(LogItem(ts=time.time(), source=source, title=title, year=year, tmdb_id=tmdb_id, tvdb_id=tvdb_id,
                                removed=res.removed, scanned_accounts=res.scanned_accounts, details=res.details))
             return res
 
+    res = await _scan_cluster(rt, accounts, source, tmdb_id, tvdb_id, title, year)
+    rt.logring.add(LogItem(ts=time.time(), source=source, title=title, year=year, tmdb_id=tmdb_id, tvdb_id=tvdb_id,
+                       removed=res.removed, scanned_accounts=res.scanned_accounts, details=res.details))
+    return res
+
+async def _scan_cluster(rt: Runtime, accounts, source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int],
+                        prefetch: bool = False) -> WebhookResult:
+    scan = _prefetch_accounts if prefetch else _scan_accounts
+    if not rt.cluster.enabled:
+        return await scan(rt, accounts, tmdb_id, tvdb_id, title, year)
+
+    # Coordinator: scan our own shard, hand the others to their owners, merge.
+    shards = rt.cluster.partition(accounts)
+    jobs = [scan(rt, shards.pop(rt.cluster.self_url, []), tmdb_id, tvdb_id, title, year)]
+    jobs += [_scan_remote(rt, node, shard, source, tmdb_id, tvdb_id, title, year, prefetch) for node, shard in shards.items()]
+    results = await asyncio.gather(*jobs)
+    return WebhookResult(
+        removed=sum(r.removed for r in results),
+        scanned_accounts=sum(r.scanned_accounts for r in results),
+        details=[d for r in results for d in r.details],
+    )
+
+async def _scan_remote(rt: Runtime, node: str, shard, source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int],
+                       prefetch: bool = False) -> WebhookResult:
+    req = ShardProcessReq(account_ids=[a.id for a in shard], source=source, tmdb_id=tmdb_id, tvdb_id=tvdb_id, title=title, year=year,
+                          prefetch=prefetch)
+    try:
+        with span(f"cluster.remote:{node}"):
+            data = await asyncio.get_running_loop().run_in_executor(None, rt.cluster.process_remote, node, req.model_dump())
+        return WebhookResult.model_validate(data)
+    except ShardNotRun as e:
+        # The owner never started it: take over the shard so the import still gets processed.
+        scan = _prefetch_accounts if prefetch else _scan_accounts
+        res = await scan(rt, shard, tmdb_id, tvdb_id, title, year)
+        res.details.insert(0, f"[cluster] {node} {e}; processed its {len(shard)} account(s) locally")
+        return res
+    except Exception as e:
+        # Timeout or error mid-request: the owner may have done (part of) the work, so don't redo it.
+        return WebhookResult(
+            removed=0,
+            scanned_accounts=len(shard),
+            details=[f"[cluster] {node} failed for {len(shard)} account(s): {e}"],
+        )
+
+async def _scan_accounts(rt: Runtime, accounts, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> WebhookResult:
+    if not accounts:
+        return WebhookResult(removed=0, scanned_accounts=0, details=[])
+
+    key = _media_key(tmdb_id, tvdb_id)
+    pending = await _run_db(rt, _consume_pending, key, [acc.id for acc in accounts], rt.settings.prefetch_ttl_s) if key else {}
+
+    with span("crypto.decrypt"):
+        tokens = await rt.crypto_pool.decrypt_many(rt.crypto, [acc.token_enc for acc in accounts])
+
     removed = 0
     details: list[str] = []
-    for acc in accounts:
+    status_updates: dict[int, dict] = {}
+    for acc, token in zip(accounts, tokens):
         try:
-            token = crypto.decrypt(acc.token_enc)
-            did, msg = plex_ops.remove_from_watchlist_if_present(
-                user_token=token,
-                tmdb_id=tmdb_id,
-                tvdb_id=tvdb_id,
-                title=title,
-                year=year,
-            )
+            if isinstance(token, Exception):
+                raise token
+            did, msg = await _remove_prefetched(rt, token, pending.get(acc.id), tmdb_id, tvdb_id)
+            if not did:
+                # Blocking HTTP: off the loop, so admission slots bound real work and sheds are immediate.
+                did, msg = await asyncio.to_thread(
+                    rt.plex_ops.remove_from_watchlist_if_present,
+                    user_token=token,
+                    tmdb_id=tmdb_id,
+                    tvdb_id=tvdb_id,
+                    title=title,
+                    year=year,
+                )
             if did:
                 removed += 1
             details.append(f"[{acc.label}] {msg}")
@@ -315,96 +444,345 @@ def _process(source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title:
             details.append(f"[{acc.label}] ERROR: {err}")
             # If auth broke, mark invalid immediately.
             if "401" in err or "Unauthorized" in err or "unauthorized" in err:
-                _mark_account_error(db, acc.id, err)
+                status_updates[acc.id] = _status_error(err)
+
+    await _run_db(rt, _write_account_status, status_updates)
+    if pending:
+        await _run_db(rt, _clear_pending, key, list(pending))
+    return WebhookResult(removed=removed, scanned_accounts=len(accounts), details=details)
+
+# ---- Grab prefetch ----
+# A Grab arrives minutes to hours before the Download. Finding each account's watchlist
+# entry then means the Download only has to issue the removal call.
+def _media_key(tmdb_id: Optional[int], tvdb_id: Optional[int]) -> Optional[str]:
+    if tmdb_id:
+        return f"tmdb:{tmdb_id}"
+    if tvdb_id:
+        return f"tvdb:{tvdb_id}"
+    return None
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _mark_consumed(db: Session, media_key: str, ttl_s: int) -> None:
+    # Lets a prefetch that was still running when the import arrived (on any node) drop its stale result.
+    now = _utcnow()
+    db.execute(delete(ConsumedMedia).where(ConsumedMedia.consumed_at < now - timedelta(seconds=ttl_s)))
+    if not db.execute(update(ConsumedMedia).where(ConsumedMedia.media_key == media_key).values(consumed_at=now)).rowcount:
+        db.add(ConsumedMedia(media_key=media_key, consumed_at=now))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another node marked it at the same moment; its mark is just as recent.
+        db.rollback()
 
-    res = WebhookResult(removed=removed, scanned_accounts=len(accounts), details=details)
-    logring.add(LogItem(ts=time.time(), source=source, title=title, year=year, tmdb_id=tmdb_id, tvdb_id=tvdb_id,
-                       removed=res.removed, scanned_accounts=res.scanned_accounts, details=res.details))
-    return res
+def _consumed_at(db: Session, media_key: str) -> Optional[datetime]:
+    return db.execute(select(ConsumedMedia.consumed_at).where(ConsumedMedia.media_key == media_key)).scalar()
+
+def _consume_pending(db: Session, media_key: str, account_ids: Sequence[int], ttl_s: int) -> dict[int, tuple[str, str]]:
+    with span("db.consume_pending"):
+        _mark_consumed(db, media_key, ttl_s)
+        return _get_pending(db, media_key, account_ids)
+
+def _get_pending(db: Session, media_key: str, account_ids: Sequence[int]) -> dict[int, tuple[str, str]]:
+    rows = db.execute(
+        select(PendingRemoval).where(
+            PendingRemoval.media_key == media_key,
+            PendingRemoval.account_id.in_(account_ids),
+            PendingRemoval.expires_at > _utcnow(),
+        )
+    ).scalars().all()
+    return {r.account_id: (r.rating_key, r.match) for r in rows}
+
+def _save_pending(db: Session, media_key: str, account_ids: Sequence[int], found: dict[int, tuple[str, str]], ttl_s: int) -> None:
+    # Replaces only this shard's rows: in cluster mode other nodes save theirs for the same title.
+    with span("db.save_pending"):
+        now = _utcnow()
+        db.execute(delete(PendingRemoval).where(PendingRemoval.expires_at <= now))
+        db.execute(delete(PendingRemoval).where(PendingRemoval.media_key == media_key, PendingRemoval.account_id.in_(account_ids)))
+        expires = now + timedelta(seconds=ttl_s)
+        db.add_all(
+            PendingRemoval(media_key=media_key, account_id=acc_id, rating_key=rk, match=how, expires_at=expires)
+            for acc_id, (rk, how) in found.items()
+        )
+        db.commit()
 
-def _event_type(payload: dict) -> str:
-    return (payload.get("eventType") or payload.get("event") or "").strip()
+def _clear_pending(db: Session, media_key: str, account_ids: Sequence[int]) -> None:
+    db.execute(delete(PendingRemoval).where(PendingRemoval.media_key == media_key, PendingRemoval.account_id.in_(account_ids)))
+    db.commit()
+
+async def _remove_prefetched(rt: Runtime, token: str, hit: Optional[tuple[str, str]], tmdb_id: Optional[int], tvdb_id: Optional[int]) -> tuple[bool, str]:
+    # (False, "") sends the account through the normal scan: no prefetch, or the entry went stale.
+    if hit is None:
+        return False, ""
+    rating_key, how = hit
+    try:
+        with span("plex.remove_prefetched"):
+            await asyncio.to_thread(rt.plex_ops.remove_by_rating_key, token, rating_key)
+    except Exception:
+        return False, ""
+    return True, f"{rt.plex_ops.match_message(how, tmdb_id, tvdb_id)} (prefetched on grab)"
+
+async def _prefetch(rt: Runtime, source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> None:
+    key = _media_key(tmdb_id, tvdb_id)
+    res = WebhookResult(removed=0, scanned_accounts=0, details=[])
+    try:
+        with rt.trace_store.trace(f"prefetch.{source}", title=title, year=year, tmdb_id=tmdb_id, tvdb_id=tvdb_id):
+            # Own limiter: prefetch is speculative and must not take import slots.
+            async with rt.prefetch_admission.slot():
+                accounts = await _run_db(rt, _get_accounts)
+                res = await _scan_cluster(rt, accounts, source, tmdb_id, tvdb_id, title, year, prefetch=True)
+    except Overloaded as e:
+        # The Download still does a full scan; prefetch is only a head start.
+        res.details.append(f"Prefetch skipped: {e}")
+    except Exception as e:
+        res.details.append(f"Prefetch failed: {e}")
+    finally:
+        rt.prefetching.discard(key)
+    rt.logring.add(LogItem(ts=time.time(), source=f"{source}:grab", title=title, year=year, tmdb_id=tmdb_id, tvdb_id=tvdb_id,
+                        removed=0, scanned_accounts=res.scanned_accounts, details=res.details))
+
+async def _prefetch_accounts(rt: Runtime, accounts, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> WebhookResult:
+    """Find (not remove) each account's watchlist entry and save it for the Download."""
+    key = _media_key(tmdb_id, tvdb_id)
+    if not accounts or key is None:
+        return WebhookResult(removed=0, scanned_accounts=0, details=[])
+
+    consumed = await _run_db(rt, _consumed_at, key)
+    with span("crypto.decrypt"):
+        tokens = await rt.crypto_pool.decrypt_many(rt.crypto, [acc.token_enc for acc in accounts])
+
+    details: list[str] = []
+    found: dict[int, tuple[str, str]] = {}
+    for acc, token in zip(accounts, tokens):
+        if isinstance(token, Exception):
+            continue
+        try:
+            hit = await asyncio.to_thread(rt.plex_ops.find_on_watchlist, token, tmdb_id, tvdb_id, title, year)
+        except Exception as e:
+            details.append(f"[{acc.label}] Prefetch failed: {e}")
+            continue
+        if hit is not None:
+            found[acc.id] = hit
+            details.append(f"[{acc.label}] On watchlist ({hit[1]} match), will remove on import")
+
+    ids = [acc.id for acc in accounts]
+    if await _run_db(rt, _consumed_at, key) == consumed:
+        await _run_db(rt, _save_pending, key, ids, found, rt.settings.prefetch_ttl_s)
+    if await _run_db(rt, _consumed_at, key) != consumed:
+        # The import was processed (on any node) while we were scanning or saving: these entries are gone.
+        await _run_db(rt, _clear_pending, key, ids)
+        details.append("Import already processed; prefetch result discarded")
+        found.clear()
+    where = f" on {rt.cluster.self_url}" if rt.cluster.enabled else ""
+    details.insert(0, f"Prefetch{where}: on the watchlist of {len(found)} of {len(accounts)} account(s)")
+    return WebhookResult(removed=0, scanned_accounts=len(accounts), details=details)
+
+def _schedule_prefetch(rt: Runtime, source: str, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> WebhookResult:
+    key = _media_key(tmdb_id, tvdb_id)
+    if key is None:
+        return WebhookResult(removed=0, scanned_accounts=0, details=["Grab without TMDB/TVDB id: nothing to prefetch"])
+    if key in rt.prefetching:
+        # e.g. several Sonarr grabs for one series: one watchlist pass covers them all
+        return WebhookResult(removed=0, scanned_accounts=0, details=[f"Grab: prefetch already running for {title} ({year})"])
+    rt.prefetching.add(key)
+    task = asyncio.create_task(_prefetch(rt, source, tmdb_id, tvdb_id, title, year))
+    rt.tasks.add(task)
+    task.add_done_callback(rt.tasks.discard)
+    return WebhookResult(removed=0, scanned_accounts=0, details=[f"Grab: watchlist prefetch scheduled for {title} ({year})"])
+
+@router.post(SHARD_PATH, response_model=WebhookResult, response_class=ORJSONResponse, dependencies=[Depends(require_cluster)])
+async def cluster_process_shard(payload: ShardProcessReq, rt: Runtime = Depends(get_rt)):
+    # Same admission slots as local webhooks (the prefetch limiter for Grab shards); a 503
+    # makes the coordinator run the shard itself.
+    if payload.prefetch:
+        name, limiter, scan = f"shard.{payload.source}:grab", rt.prefetch_admission, _prefetch_accounts
+    else:
+        name, limiter, scan = f"shard.{payload.source}", rt.admission, _scan_accounts
+    with rt.trace_store.trace(name, title=payload.title, accounts=len(payload.account_ids)) as tr:
+        try:
+            async with limiter.slot():
+                accounts = await _run_db(rt, _get_accounts, payload.account_ids)
+                return await scan(rt, accounts, payload.tmdb_id, payload.tvdb_id, payload.title, payload.year)
+        except Overloaded as e:
+            tr.attrs["shed"] = str(e)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 def _should_process_event(event_type: str) -> bool:
     return event_type.lower() == "download"
 
-@app.post("/webhook/radarr", response_model=WebhookResult, dependencies=[Depends(require_webhook)])
-async def webhook_radarr(request: Request, db: Session = Depends(get_db)):
-    payload = await request.json()
-    et = _event_type(payload)
-    if not _should_process_event(et):
-        return WebhookResult(removed=0, scanned_accounts=0, details=[f"Ignored eventType={et!r} (accepted: 'Download')"])
+def _is_prefetch_event(rt: Runtime, event_type: str) -> bool:
+    return rt.settings.prefetch_on_grab and event_type.lower() == "grab"
 
-    movie = payload.get("movie") or {}
-    tmdb_id = movie.get("tmdbId")
-    title = movie.get("title") or payload.get("title") or "Unknown"
-    year = movie.get("year")
+def _ignored(rt: Runtime, event_type: str) -> WebhookResult:
+    accepted = "'Download', 'Grab'" if rt.settings.prefetch_on_grab else "'Download'"
+    return WebhookResult(removed=0, scanned_accounts=0, details=[f"Ignored eventType={event_type!r} (accepted: {accepted})"])
 
-    def to_int(x):
-        try:
-            return int(x) if x is not None else None
-        except Exception:
-            return None
+_P = TypeVar("_P", bound=ArrEvent)
 
-    return _process(source="radarr", tmdb_id=to_int(tmdb_id), tvdb_id=None, title=title, year=to_int(year), db=db)
+def _parse_webhook(rt: Runtime, body: bytes, model: type[_P]) -> tuple[str, Optional[_P]]:
+    # The body is decoded once. Ignored events only look at eventType; the others are
+    # validated into the typed model from the same decoded object.
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid webhook payload: {e}")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=422, detail="Invalid webhook payload: expected a JSON object")
+
+    kind = str(data.get("eventType") or data.get("event") or "").strip()
+    if not (_should_process_event(kind) or _is_prefetch_event(rt, kind)):
+        return kind, None
+    try:
+        return kind, model.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid webhook payload: {e.errors(include_url=False)}")
+
+@router.post("/webhook/radarr", response_model=WebhookResult, response_class=ORJSONResponse, dependencies=[Depends(require_webhook)])
+async def webhook_radarr(request: Request, rt: Runtime = Depends(get_rt)):
+    et, payload = _parse_webhook(rt, await request.body(), RadarrWebhook)
+    if payload is None:
+        return _ignored(rt, et)
+
+    movie = payload.movie
+    title = (movie.title if movie else None) or payload.title or "Unknown"
+    if _is_prefetch_event(rt, et):
+        return _schedule_prefetch(rt, "radarr", movie.tmdb_id if movie else None, None, title, movie.year if movie else None)
+    return await _process(
+        rt,
+        source="radarr",
+        tmdb_id=movie.tmdb_id if movie else None,
+        tvdb_id=None,
+        title=title,
+        year=movie.year if movie else None,
+    )
 
-@app.post("/webhook/sonarr", response_model=WebhookResult, dependencies=[Depends(require_webhook)])
-async def webhook_sonarr(request: Request, db: Session = Depends(get_db)):
-    payload = await request.json()
-    et = _event_type(payload)
-    if not _should_process_event(et):
-        return WebhookResult(removed=0, scanned_accounts=0, details=[f"Ignored eventType={et!r} (accepted: 'Download')"])
+@router.post("/webhook/sonarr", response_model=WebhookResult, response_class=ORJSONResponse, dependencies=[Depends(require_webhook)])
+async def webhook_sonarr(request: Request, rt: Runtime = Depends(get_rt)):
+    et, payload = _parse_webhook(rt, await request.body(), SonarrWebhook)
+    if payload is None:
+        return _ignored(rt, et)
+
+    series = payload.series
+    title = (series.title if series else None) or payload.title or "Unknown"
+    if _is_prefetch_event(rt, et):
+        return _schedule_prefetch(rt, "sonarr", None, series.tvdb_id if series else None, title, series.year if series else None)
+    return await _process(
+        rt,
+        source="sonarr",
+        tmdb_id=None,
+        tvdb_id=series.tvdb_id if series else None,
+        title=title,
+        year=series.year if series else None,
+    )
 
-    series = payload.get("series") or {}
-    tvdb_id = series.get("tvdbId")
-    title = series.get("title") or payload.get("title") or "Unknown"
-    year = series.get("year")
+# ---- Diagnostics ----
+@router.get("/api/debug/admission", dependencies=[Depends(require_auth)])
+def debug_admission(rt: Runtime = Depends(get_rt)):
+    return {**rt.admission.stats(), "prefetch": rt.prefetch_admission.stats()}
 
-    def to_int(x):
-        try:
-            return int(x) if x is not None else None
-        except Exception:
-            return None
+@router.get("/api/debug/plex-servers", dependencies=[Depends(require_auth)])
+def debug_plex_servers(rt: Runtime = Depends(get_rt)):
+    return {"timeout_s": rt.plex_ops.server_timeout_s, "servers": rt.plex_ops.server_stats()}
+
+@router.get("/api/debug/cluster", dependencies=[Depends(require_auth)])
+def debug_cluster(rt: Runtime = Depends(get_rt)):
+    return {"enabled": rt.cluster.enabled, "self": rt.cluster.self_url, "nodes": rt.cluster.ring.nodes}
 
-    return _process(source="sonarr", tmdb_id=None, tvdb_id=to_int(tvdb_id), title=title, year=to_int(year), db=db)
+@router.get("/api/debug/traces", dependencies=[Depends(require_auth)])
+def debug_traces(rt: Runtime = Depends(get_rt)):
+    return {"keep": rt.settings.trace_keep, "items": rt.trace_store.slowest()}
+
+@router.delete("/api/debug/traces", dependencies=[Depends(require_auth)])
+def debug_traces_clear(rt: Runtime = Depends(get_rt)):
+    rt.trace_store.clear()
+    return {"ok": True}
+
+@router.get("/api/debug/profile", dependencies=[Depends(require_auth)])
+async def debug_profile(seconds: float = 10.0, format: str = "pstats", sort: str = "cumulative"):
+    # Profiles the event loop thread for a time window. Executor threads (Fernet, Plex
+    # and cluster calls) aren't captured; their time shows up in /api/debug/traces.
+    if format not in ("pstats", "text"):
+        raise HTTPException(status_code=400, detail="format must be 'pstats' or 'text'")
+    seconds = max(1.0, min(seconds, 120.0))
+    prof = profile_capture.start()
+    if prof is None:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile_capture.stop(prof)
+
+    if format == "text":
+        try:
+            return Response(content=pstats_text(prof, sort=sort), media_type="text/plain")
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort!r}")
+    fname = f"removarr-{int(time.time())}.pstats"
+    return Response(
+        content=pstats_bytes(prof),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{fname}"'},
+    )
 
 # ---- Daily status check background task ----
-async def _daily_status_checker():
+async def _daily_status_checker(rt: Runtime):
     # checks once per day; first run after ~60s
     await asyncio.sleep(60)
     while True:
         try:
-            db = SessionLocal()
-            accounts = db.execute(select(PlexAccount)).scalars().all()
-            for acc in accounts:
-                token = None
+            # In cluster mode every node checks only the accounts it owns.
+            accounts = [a for a in await _run_db(rt, _get_accounts) if rt.cluster.is_local(a.id)]
+            tokens = await rt.crypto_pool.decrypt_many(rt.crypto, [acc.token_enc for acc in accounts])
+            status_updates: dict[int, dict] = {}
+            for acc, token in zip(accounts, tokens):
                 try:
-                    token = crypto.decrypt(acc.token_enc)
-                    ok, msg = plex_ops.validate_user_token(token)
-                    if ok:
-                        _mark_account_ok(db, acc.id)
-                    else:
-                        _mark_account_error(db, acc.id, msg)
+                    if isinstance(token, Exception):
+                        raise token
+                    ok, msg = await asyncio.to_thread(rt.plex_ops.validate_user_token, token)
+                    status_updates[acc.id] = _status_ok() if ok else _status_error(msg)
                 except Exception as e:
-                    _mark_account_error(db, acc.id, str(e))
-            db.close()
+                    status_updates[acc.id] = _status_error(str(e))
+            await _run_db(rt, _write_account_status, status_updates)
         except Exception:
             pass
         await asyncio.sleep(60 * 60 * 24)
 
-@app.on_event("startup")
-async def on_startup():
-    asyncio.create_task(_daily_status_checker())
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    rt: Runtime = app.state.rt
+    rt.start(app.state.settings or get_settings(), STATIC_DIR)
+    rt.tasks.add(asyncio.create_task(_daily_status_checker(rt)))
+    try:
+        yield
+    finally:
+        for task in list(rt.tasks):
+            task.cancel()
+        await rt.aclose()
 
 # ---- Serve SPA ----
-if STATIC_DIR.exists():
-    app.mount("/assets", StaticFiles(directory=str(STATIC_DIR / "assets")), name="assets")
+@router.api_route("/assets/{asset_path:path}", methods=["GET", "HEAD"])  # StaticFiles answered HEAD too
+async def assets(asset_path: str, request: Request, rt: Runtime = Depends(get_rt)):
+    res = rt.static_bundle.asset_response(request, asset_path)
+    if res is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return res
 
-@app.get("/{full_path:path}")
-def spa(full_path: str):
+@router.get("/{full_path:path}")
+async def spa(full_path: str, request: Request, rt: Runtime = Depends(get_rt)):
     if full_path.startswith("api") or full_path.startswith("webhook") or full_path.startswith("health"):
         raise HTTPException(status_code=404, detail="Not found")
-    index = STATIC_DIR / "index.html"
-    if not index.exists():
+    if not rt.static_bundle.built:
         raise HTTPException(status_code=500, detail="Frontend not built")
-    return FileResponse(str(index))
+    return rt.static_bundle.index_response(request)
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    app = FastAPI(title="Removarr", version="0.4.11", lifespan=lifespan)
+    # Each app owns its resources; nothing settings-dependent is shared between apps.
+    # `settings` defaults to the environment (read at startup).
+    app.state.settings = settings
+    app.state.rt = Runtime()
+    app.include_router(router)
+    return app
+
+app = create_app()
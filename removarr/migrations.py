@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Callable
+import time
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from .db import Base
+from .models import AppSetting
+
+VERSION_KEY = "schema_version"
+
+def _create_all(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn)
+
+# version -> step that brings the schema from version-1 to version.
+# create_all only adds missing tables, so it is safe on databases that predate versioning.
+MIGRATIONS: dict[int, Callable[[Connection], None]] = {
+    1: _create_all,
+    2: _create_all,  # pending_removals
+    3: _create_all,  # consumed_media
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+def current_version(conn: Connection) -> int:
+    try:
+        value = conn.execute(select(AppSetting.value).where(AppSetting.key == VERSION_KEY)).scalar()
+    except (OperationalError, ProgrammingError):
+        # fresh database: app_settings doesn't exist yet
+        conn.rollback()
+        return 0
+    try:
+        return int(value) if value is not None else 0
+    except ValueError:
+        return 0
+
+def _migrate(engine: Engine, version: int) -> None:
+    with engine.begin() as conn:
+        for v in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[v](conn)
+        table = AppSetting.__table__
+        updated = conn.execute(
+            update(table).where(table.c.key == VERSION_KEY).values(value=str(SCHEMA_VERSION))
+        ).rowcount
+        if not updated:
+            conn.execute(insert(table).values(key=VERSION_KEY, value=str(SCHEMA_VERSION)))
+
+def ensure_schema(engine: Engine, attempts: int = 3) -> int:
+    """Bring the database up to SCHEMA_VERSION; a single SELECT when it already is."""
+    for attempt in range(attempts):
+        with engine.connect() as conn:
+            version = current_version(conn)
+        if version >= SCHEMA_VERSION:
+            return version
+        try:
+            _migrate(engine, version)
+            return SCHEMA_VERSION
+        except (OperationalError, IntegrityError, ProgrammingError):
+            # Another process (e.g. a second cluster node) migrating at the same time;
+            # SQLite DDL isn't transactional here, so re-check and retry.
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.2 * (attempt + 1))
+    return SCHEMA_VERSION
@@ -51,3 +51,27 @@ class AppSetting(Base):
     value: Mapped[str] = mapped_column(String(4000), nullable=False)
 
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class PendingRemoval(Base):
+    # Watchlist entries found on a Grab, consumed by the matching Download (see prefetch in main).
+    __tablename__ = "pending_removals"
+    __table_args__ = (UniqueConstraint("media_key", "account_id", name="uq_pending_removals_media_account"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    media_key: Mapped[str] = mapped_column(String(60), nullable=False, index=True)  # tmdb:<id>|tvdb:<id>
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    rating_key: Mapped[str] = mapped_column(String(200), nullable=False)
+    match: Mapped[str] = mapped_column(String(30), nullable=False)  # tmdb|tvdb|title|title/year
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+class ConsumedMedia(Base):
+    # When a Download for the title was last processed. Shared by cluster nodes, so a Grab
+    # prefetch still running on any node can tell that the import beat it (see prefetch in main).
+    __tablename__ = "consumed_media"
+    __table_args__ = (UniqueConstraint("media_key", name="uq_consumed_media_key"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    media_key: Mapped[str] = mapped_column(String(60), nullable=False)  # tmdb:<id>|tvdb:<id>
+    consumed_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,49 +1,152 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
+import threading
+import time
 
 import requests
 import xml.etree.ElementTree as ET
-from plexapi.myplex import MyPlexAccount
-from plexapi.server import PlexServer
 
+if TYPE_CHECKING:  # plexapi is a heavy import; it is loaded on first PMS/account use
+    from plexapi.myplex import MyPlexAccount
+    from plexapi.server import PlexServer
+
+from .tracing import record_span, span
 from .utils import extract_guid_ids, norm_title
 
+DISCOVER_BASE = "https://discover.provider.plex.tv"
+_MATCH_LABELS = {"tmdb": "TMDB", "tvdb": "TVDB", "title": "title"}
+
+@dataclass(frozen=True)
+class PlexServerConf:
+    name: str
+    url: str
+    token: str
+
+@dataclass
+class ServerStats:
+    searches: int = 0
+    hits: int = 0
+    errors: int = 0
+    skipped: int = 0
+    last_ms: Optional[float] = None
+    avg_ms: Optional[float] = None
+    last_error: Optional[str] = None
+
 class PlexOps:
-    def __init__(self, plex_base_url: Optional[str], plex_server_token: Optional[str]):
-        self.plex_base_url = plex_base_url
-        self.plex_server_token = plex_server_token
-        self._server: Optional[PlexServer] = None
-
-    def _get_server(self) -> Optional[PlexServer]:
-        if not self.plex_base_url or not self.plex_server_token:
-            return None
-        if self._server is None:
-            self._server = PlexServer(self.plex_base_url, self.plex_server_token)
-        return self._server
+    def __init__(self, servers: list[PlexServerConf], watchlist_page_size: int = 50, server_timeout_s: float = 10.0):
+        self.servers = list(servers)
+        self.watchlist_page_size = max(1, watchlist_page_size)
+        self.server_timeout_s = server_timeout_s
+        self._conns: dict[str, PlexServer] = {}
+        self._stats: dict[str, ServerStats] = {c.name: ServerStats() for c in self.servers}
+        self._lock = threading.Lock()
+        self._running: dict[str, list[float]] = {c.name: [] for c in self.servers}  # start times of in-flight searches
+        # Headroom for several webhooks searching at once; hung servers are skipped (see _hung).
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.servers)) * 4, thread_name_prefix="removarr-pms")
+        # Shared by all Discover calls, so each page and remove reuses a pooled TLS connection.
+        self._discover_session = requests.Session()
+
+    def _get_server(self, conf: PlexServerConf) -> PlexServer:
+        # One PlexServer (and so one pooled requests.Session) per configured server.
+        with self._lock:
+            server = self._conns.get(conf.name)
+        if server is None:
+            from plexapi.server import PlexServer
+
+            server = PlexServer(conf.url, conf.token, session=requests.Session(), timeout=self.server_timeout_s)
+            with self._lock:
+                server = self._conns.setdefault(conf.name, server)
+        return server
+
+    def _hung(self, name: str, now: float) -> bool:
+        # A search still running past the timeout means the server is hanging; don't queue more behind it.
+        with self._lock:
+            return any(now - t0 > self.server_timeout_s for t0 in self._running[name])
+
+    def server_stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {name: dict(vars(st)) for name, st in self._stats.items()}
+
+    def _record(self, name: str, elapsed: float, hit: bool, error: Optional[str]) -> None:
+        ms = round(elapsed * 1000, 3)
+        with self._lock:
+            st = self._stats[name]
+            st.searches += 1
+            st.hits += int(hit)
+            st.last_ms = ms
+            st.avg_ms = ms if st.avg_ms is None else round(st.avg_ms + (ms - st.avg_ms) / st.searches, 3)
+            if error is not None:
+                st.errors += 1
+                st.last_error = error[:300]
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._discover_session.close()
 
     def account(self, user_token: str) -> MyPlexAccount:
+        from plexapi.myplex import MyPlexAccount
+
         return MyPlexAccount(token=user_token)
 
     def validate_user_token(self, user_token: str) -> tuple[bool, str]:
         try:
-            acct = self.account(user_token)
-            # Touch a property that requires auth.
-            _ = acct.username
+            with span("plex.validate_token"):
+                acct = self.account(user_token)
+                # Touch a property that requires auth.
+                _ = acct.username
             return True, getattr(acct, "username", "") or "ok"
         except Exception as e:
             return False, str(e)
 
     def is_available_in_library(self, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> bool:
-        server = self._get_server()
-        if server is None:
+        """True if any configured server has the title; servers are searched concurrently."""
+        if not self.servers:
             return True
 
+        with span("plex.library_search"):
+            now = time.monotonic()
+            pending = set()
+            for c in self.servers:
+                if self._hung(c.name, now):
+                    with self._lock:
+                        self._stats[c.name].skipped += 1
+                    continue
+                pending.add(self._pool.submit(self._search_server, c, tmdb_id, tvdb_id, title, year))
+            deadline = now + self.server_timeout_s
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                if any(f.result() for f in done):
+                    return True
+        return False
+
+    def _search_server(self, conf: PlexServerConf, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> bool:
+        started = time.monotonic()
+        with self._lock:
+            self._running[conf.name].append(started)
+        t0 = time.perf_counter()
         try:
-            results = server.search(query=title)
-        except Exception:
+            results = self._get_server(conf).search(query=title)
+        except Exception as e:
+            # a slow or broken server counts as "not found here"; others may still have it
+            self._record(conf.name, time.perf_counter() - t0, False, str(e))
+            with self._lock:
+                self._conns.pop(conf.name, None)
             return False
+        finally:
+            with self._lock:
+                self._running[conf.name].remove(started)
+        hit = self._library_match(results, tmdb_id, tvdb_id, title, year)
+        self._record(conf.name, time.perf_counter() - t0, hit, None)
+        return hit
 
+    @staticmethod
+    def _library_match(results, tmdb_id: Optional[int], tvdb_id: Optional[int], title: str, year: Optional[int]) -> bool:
         target_title = norm_title(title)
         for r in results:
             try:
@@ -53,7 +156,7 @@ class PlexOps:
                     continue
                 if year and r_year and int(r_year) != int(year):
                     continue
-                gid = extract_guid_ids(getattr(r, "guids", None) or [])
+                gid = extract_guid_ids([getattr(g, "id", g) for g in getattr(r, "guids", None) or []])
                 if tmdb_id and gid.get("tmdb") == str(tmdb_id):
                     return True
                 if tvdb_id and gid.get("tvdb") == str(tvdb_id):
@@ -64,27 +167,77 @@ class PlexOps:
                 continue
         return False
 
+    def _discover_watchlist_items(self, user_token: str) -> Iterator[ET.Element]:
+        """Yield watchlist entries page by page, parsing each response as it streams in.
 
-    def _discover_watchlist_xml(self, user_token: str) -> str:
+        Entries are cleared once the caller moves on, so memory stays bounded by one
+        page; closing the generator early (match found) skips the remaining pages.
+        Each page is traced as one span covering the request, the body download and
+        the XML parse, but not the caller's time between entries.
+        """
         # Plex migrated Watchlist APIs from metadata.provider.plex.tv to discover.provider.plex.tv.
         # Using direct HTTP avoids PlexAPI breakages.
-        base = "https://discover.provider.plex.tv"
-        url = f"{base}/library/sections/watchlist/all"
-        params = {
-            "includeCollections": "1",
-            "includeExternalMedia": "1",
-            "X-Plex-Token": user_token,
-        }
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        return r.text
-
-    def _discover_remove_watchlist(self, user_token: str, rating_key: str) -> None:
-        base = "https://discover.provider.plex.tv"
-        url = f"{base}/actions/removeFromWatchlist"
+        url = f"{DISCOVER_BASE}/library/sections/watchlist/all"
+        size = self.watchlist_page_size
+        start = 0
+        while True:
+            params = {
+                "includeCollections": "1",
+                "includeExternalMedia": "1",
+                "X-Plex-Container-Start": str(start),
+                "X-Plex-Container-Size": str(size),
+                "X-Plex-Token": user_token,
+            }
+            page_start = t = time.perf_counter()
+            busy = 0.0
+            r = None
+            try:
+                r = self._discover_session.get(url, params=params, timeout=20, stream=True)
+                r.raise_for_status()
+                r.raw.decode_content = True
+                count = 0
+                total: Optional[int] = None
+                depth = 0
+                root: Optional[ET.Element] = None
+                for event, el in ET.iterparse(r.raw, events=("start", "end")):
+                    if event == "start":
+                        if root is None:
+                            root = el
+                            try:
+                                total = int(el.attrib.get("totalSize", ""))
+                            except ValueError:
+                                total = None
+                        depth += 1
+                        continue
+                    depth -= 1
+                    if el.attrib.get("ratingKey") or el.attrib.get("ratingkey"):
+                        busy += time.perf_counter() - t
+                        t = None
+                        yield el
+                        t = time.perf_counter()
+                    if depth == 1:
+                        count += 1
+                        root.clear()  # drop entries we're done with
+            finally:
+                if t is not None:
+                    busy += time.perf_counter() - t
+                record_span("discover.watchlist_page", page_start, busy)
+                if r is not None:
+                    r.close()
+
+            start += count
+            # Servers may cap the page below what we asked for, so a short page only
+            # means "done" when totalSize is missing.
+            if count == 0 or (start >= total if total is not None else count < size):
+                return
+
+    def remove_by_rating_key(self, user_token: str, rating_key: str) -> None:
+        """Remove one watchlist entry by its Discover ratingKey (e.g. from find_on_watchlist)."""
+        url = f"{DISCOVER_BASE}/actions/removeFromWatchlist"
         params = {"ratingKey": rating_key, "X-Plex-Token": user_token}
-        r = requests.put(url, params=params, timeout=20)
-        r.raise_for_status()
+        with span("discover.watchlist_remove"):
+            r = self._discover_session.put(url, params=params, timeout=20)
+            r.raise_for_status()
 
     def remove_from_watchlist_if_present(
         self,
@@ -94,75 +247,91 @@ class PlexOps:
         title: str,
         year: Optional[int],
     ) -> Tuple[bool, str]:
-        # Fetch watchlist from Plex Discover API (XML)
+        target_title = norm_title(title)
+        items = self._discover_watchlist_items(user_token)
         try:
-            xml_text = self._discover_watchlist_xml(user_token)
+            for node in items:
+                how = self._match_watchlist_node(node, tmdb_id, tvdb_id, target_title, year)
+                if how is None:
+                    continue
+                rk = node.attrib.get("ratingKey") or node.attrib.get("ratingkey")
+                try:
+                    self.remove_by_rating_key(user_token, rk)
+                    return True, self.match_message(how, tmdb_id, tvdb_id)
+                except Exception as e:
+                    if how == "title/year":
+                        continue
+                    return False, f"Remove failed ({_MATCH_LABELS[how]} match): {e}"
+        except ET.ParseError as e:
+            return False, f"Failed to parse watchlist XML: {e}"
         except Exception as e:
             return False, f"Failed to fetch watchlist: {e}"
+        finally:
+            items.close()
+
+        return False, "Not on watchlist"
 
+    def find_on_watchlist(
+        self,
+        user_token: str,
+        tmdb_id: Optional[int],
+        tvdb_id: Optional[int],
+        title: str,
+        year: Optional[int],
+    ) -> Optional[Tuple[str, str]]:
+        """(ratingKey, how it matched) of the first matching entry, without removing it.
+
+        Fetch/parse errors propagate to the caller.
+        """
         target_title = norm_title(title)
+        items = self._discover_watchlist_items(user_token)
         try:
-            root = ET.fromstring(xml_text)
-        except Exception as e:
-            return False, f"Failed to parse watchlist XML: {e}"
-
-        # Iterate all nodes; watchlist entries typically have ratingKey + title.
-        for node in root.iter():
-            rk = node.attrib.get("ratingKey") or node.attrib.get("ratingkey")
-            if not rk:
-                continue
+            for node in items:
+                how = self._match_watchlist_node(node, tmdb_id, tvdb_id, target_title, year)
+                if how is not None:
+                    return node.attrib.get("ratingKey") or node.attrib.get("ratingkey"), how
+        finally:
+            items.close()
+        return None
 
-            node_title = norm_title(node.attrib.get("title", "") or "")
-            node_year = node.attrib.get("year")
-            guid = node.attrib.get("guid", "") or ""
+    @staticmethod
+    def match_message(how: str, tmdb_id: Optional[int], tvdb_id: Optional[int]) -> str:
+        if how == "tmdb":
+            return f"Removed by TMDB {tmdb_id}"
+        if how == "tvdb":
+            return f"Removed by TVDB {tvdb_id}"
+        return f"Removed by {how} fallback"
 
-            gids = {"raw": guid}
-            # extract ids from guid string + nested Guid tags
-            if guid:
-                try:
-                    tmp = extract_guid_ids([{"id": guid}])  # type: ignore[arg-type]
-                    gids.update(tmp)
-                except Exception:
-                    pass
-
-            for g in node.findall(".//Guid"):
-                gid = g.attrib.get("id") or ""
-                if gid:
-                    try:
-                        tmp = extract_guid_ids([{"id": gid}])  # type: ignore[arg-type]
-                        gids.update(tmp)
-                    except Exception:
-                        continue
+    @staticmethod
+    def _match_watchlist_node(
+        node: ET.Element,
+        tmdb_id: Optional[int],
+        tvdb_id: Optional[int],
+        target_title: str,
+        year: Optional[int],
+    ) -> Optional[str]:
+        """How `node` matches ("tmdb", "tvdb", "title", "title/year"), or None."""
+        node_title = norm_title(node.attrib.get("title", "") or "")
+        node_year = node.attrib.get("year")
 
-            # Prefer exact id matches
-            if tmdb_id and (gids.get("tmdb") == str(tmdb_id)):
-                try:
-                    self._discover_remove_watchlist(user_token, rk)
-                    return True, f"Removed by TMDB {tmdb_id}"
-                except Exception as e:
-                    return False, f"Remove failed (TMDB match): {e}"
+        # extract ids from guid string + nested Guid tags
+        guids = [node.attrib.get("guid", "") or ""]
+        guids += [g.attrib.get("id") or "" for g in node.findall(".//Guid")]
+        gids = extract_guid_ids(guids)
 
-            if tvdb_id and (gids.get("tvdb") == str(tvdb_id)):
-                try:
-                    self._discover_remove_watchlist(user_token, rk)
-                    return True, f"Removed by TVDB {tvdb_id}"
-                except Exception as e:
-                    return False, f"Remove failed (TVDB match): {e}"
-
-            # Fallback: title/year
-            if node_title and node_title == target_title:
-                if year is None:
-                    try:
-                        self._discover_remove_watchlist(user_token, rk)
-                        return True, "Removed by title fallback"
-                    except Exception as e:
-                        return False, f"Remove failed (title match): {e}"
-                else:
-                    try:
-                        if node_year and int(node_year) == int(year):
-                            self._discover_remove_watchlist(user_token, rk)
-                            return True, "Removed by title/year fallback"
-                    except Exception:
-                        pass
+        # Prefer exact id matches
+        if tmdb_id and (gids.get("tmdb") == str(tmdb_id)):
+            return "tmdb"
+        if tvdb_id and (gids.get("tvdb") == str(tvdb_id)):
+            return "tvdb"
 
-        return False, "Not on watchlist"
+        # Fallback: title/year
+        if node_title and node_title == target_title:
+            if year is None:
+                return "title"
+            try:
+                if node_year and int(node_year) == int(year):
+                    return "title/year"
+            except Exception:
+                pass
+        return None
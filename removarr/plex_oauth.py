@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 import time
 import threading
 
-from plexapi.myplex import MyPlexPinLogin, MyPlexAccount
+if TYPE_CHECKING:  # imported lazily in start(): plexapi is slow to import
+    from plexapi.myplex import MyPlexPinLogin
 
 @dataclass
 class OAuthFlow:
@@ -19,6 +20,8 @@ class PlexOAuthManager:
         self._lock = threading.Lock()
 
     def start(self, flow_id: str) -> str:
+        from plexapi.myplex import MyPlexPinLogin
+
         pl = MyPlexPinLogin(oauth=True)
         url = pl.oauthUrl()
         with self._lock:
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from pathlib import Path
+import asyncio
+from typing import Optional
+
+from .admission import AdmissionController
+from .auth import LoginThrottle, trusted_networks
+from .cluster import Cluster
+from .config import Settings
+from .crypto import Crypto
+from .logring import LogRing
+from .db import make_engine, make_session_factory, make_async_engine, make_async_session_factory
+from .migrations import ensure_schema
+from .plex_client import PlexOps, PlexServerConf
+from .plex_oauth import PlexOAuthManager
+from .static_files import StaticBundle
+from .tracing import TraceStore
+from .workers import CryptoExecutor
+
+class Runtime:
+    """Resources owned by one app instance.
+
+    create_app() makes an empty Runtime (stored on app.state) and the app's lifespan
+    fills it in with start(), so importing removarr.main touches neither the
+    environment nor the disk, and two apps never share pools or engines.
+    """
+
+    settings: Settings
+    engine: object
+    SessionLocal: object
+    async_engine: Optional[object]
+    AsyncSessionLocal: Optional[object]
+    crypto: Crypto
+    plex_ops: PlexOps
+    trace_store: TraceStore
+    crypto_pool: CryptoExecutor
+    admission: AdmissionController
+    prefetch_admission: AdmissionController
+    login_throttle: LoginThrottle
+    trusted_proxies: list
+    static_bundle: StaticBundle
+    cluster: Cluster
+
+    def __init__(self):
+        self.started = False
+        self.logring = LogRing(maxlen=400)
+        self.oauth_mgr = PlexOAuthManager()
+        self.tasks: set[asyncio.Task] = set()  # background tasks, cancelled on shutdown
+        self.prefetching: set[str] = set()  # media keys with a Grab prefetch scheduled or running
+
+    def start(self, settings: Settings, static_dir: Path) -> None:
+        if self.started:
+            return
+        s = settings
+        self.settings = s
+
+        sqlite_opts = dict(
+            synchronous=s.sqlite_synchronous,
+            busy_timeout_ms=s.sqlite_busy_timeout_ms,
+            cache_kb=s.sqlite_cache_kb,
+        )
+        self.engine = make_engine(s.db_url, **sqlite_opts)
+        self.SessionLocal = make_session_factory(self.engine)
+        ensure_schema(self.engine)
+
+        # Optional async engine (aiosqlite) for the webhook and background paths.
+        self.async_engine = make_async_engine(s.db_url, **sqlite_opts) if s.db_async else None
+        self.AsyncSessionLocal = make_async_session_factory(self.async_engine) if self.async_engine is not None else None
+
+        self.crypto = Crypto(s.secret_key)
+        self.plex_ops = PlexOps(
+            [PlexServerConf(name=p.name, url=p.url, token=p.token) for p in s.all_plex_servers()],
+            watchlist_page_size=s.watchlist_page_size,
+            server_timeout_s=s.plex_server_timeout_s,
+        )
+        self.trace_store = TraceStore(keep=s.trace_keep)
+        self.crypto_pool = CryptoExecutor(
+            hash_workers=s.hash_workers,
+            fernet_threads=s.crypto_threads,
+            max_pending_hashes=s.login_max_pending,
+        )
+        self.admission = AdmissionController(
+            max_in_flight=s.webhook_max_in_flight,
+            max_queue=s.webhook_max_queue,
+            queue_timeout_s=s.webhook_queue_timeout_s,
+            retry_after_s=s.webhook_retry_after_s,
+        )
+        self.prefetch_admission = AdmissionController(
+            max_in_flight=s.prefetch_max_in_flight,
+            max_queue=s.prefetch_max_queue,
+            queue_timeout_s=s.webhook_queue_timeout_s,
+            retry_after_s=s.webhook_retry_after_s,
+        )
+        self.login_throttle = LoginThrottle(
+            max_failures=s.login_max_failures,
+            window_s=s.login_window_s,
+            lockout_s=s.login_lockout_s,
+        )
+        self.trusted_proxies = trusted_networks(s.trusted_proxies)
+        self.static_bundle = StaticBundle(static_dir)
+        self.cluster = Cluster(
+            s.cluster_self,
+            s.cluster_nodes,
+            s.cluster_token,
+            timeout_s=s.cluster_timeout_s,
+            connect_timeout_s=s.cluster_connect_timeout_s,
+        )
+        self.started = True
+
+    async def aclose(self) -> None:
+        if not self.started:
+            return
+        self.crypto_pool.shutdown()
+        self.plex_ops.close()
+        self.cluster.close()
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        self.engine.dispose()
+        self.started = False
@@ -1,6 +1,6 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+from typing import Annotated, Any, Optional
 
 class AccountCreate(BaseModel):
     label: str = Field(..., min_length=1, max_length=200)
@@ -20,6 +20,54 @@ class WebhookResult(BaseModel):
     scanned_accounts: int
     details: list[str] = []
 
+# ---- Radarr/Sonarr webhook payloads ----
+# Only the fields Removarr uses are declared; everything else is ignored while parsing.
+
+def _lenient_int(v: Any) -> Optional[int]:
+    try:
+        return int(v) if v is not None else None
+    except Exception:
+        return None
+
+LenientInt = Annotated[Optional[int], BeforeValidator(_lenient_int)]
+
+class ArrEvent(BaseModel):
+    # Common base for *arr payloads. eventType is read from the decoded body before
+    # validation (see main._parse_webhook), so it isn't a field here.
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
+class RadarrMovie(BaseModel):
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
+    tmdb_id: LenientInt = Field(None, alias="tmdbId")
+    title: Optional[str] = None
+    year: LenientInt = None
+
+class RadarrWebhook(ArrEvent):
+    movie: Optional[RadarrMovie] = None
+    title: Optional[str] = None
+
+class SonarrSeries(BaseModel):
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
+    tvdb_id: LenientInt = Field(None, alias="tvdbId")
+    title: Optional[str] = None
+    year: LenientInt = None
+
+class SonarrWebhook(ArrEvent):
+    series: Optional[SonarrSeries] = None
+    title: Optional[str] = None
+
+class ShardProcessReq(BaseModel):
+    # Sent by the coordinating node to the owner of `account_ids` (cluster mode)
+    account_ids: list[int]
+    source: str
+    tmdb_id: Optional[int] = None
+    tvdb_id: Optional[int] = None
+    title: str
+    year: Optional[int] = None
+    prefetch: bool = False  # Grab: find and save the watchlist entries instead of removing them
+
 class SetupAdmin(BaseModel):
     username: str = Field(..., min_length=3, max_length=120)
     password: str = Field(..., min_length=8, max_length=256)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Optional
+import gzip
+import hashlib
+import os
+import sys
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+try:  # optional: brotli variants are only produced/served when the package is installed
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Encodings in order of preference, with the suffix of their precompressed file.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".wasm", ".ico"}
+MIN_COMPRESS_SIZE = 512
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+def _etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set[str]:
+    out: set[str] = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        out.add(name)
+    if "*" in out:
+        out.update(enc for enc, _ in ENCODINGS)
+    return out
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 keeps the output (and so the ETag) stable across builds
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+def precompress(root: Path) -> int:
+    """Write .gz (and .br, if brotli is installed) next to every compressible file under `root`."""
+    written = 0
+    for path in sorted(root.rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE:
+            continue
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            continue
+        for enc, suffix in ENCODINGS:
+            if enc == "br" and brotli is None:
+                continue
+            packed = _compress(data, enc)
+            if len(packed) < len(data):
+                path.with_name(path.name + suffix).write_bytes(packed)
+                written += 1
+    return written
+
+@dataclass
+class _Variant:
+    path: Path
+    stat: os.stat_result
+    etag: str
+
+@dataclass
+class _Asset:
+    media_type: str
+    variants: dict[str, _Variant] = field(default_factory=dict)  # "identity" | "gzip" | "br"
+
+class StaticBundle:
+    """Serves the built SPA: index.html from memory, /assets from a file table built once at startup.
+
+    Hashed files under assets/ are cached as immutable; index.html always revalidates via ETag.
+    Precompressed .br/.gz siblings are picked according to Accept-Encoding.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._index: dict[str, tuple[bytes, str]] = {}
+        self._assets: dict[str, _Asset] = {}
+        self.reload()
+
+    @property
+    def built(self) -> bool:
+        return "identity" in self._index
+
+    def reload(self) -> None:
+        self._index = {}
+        self._assets = {}
+        index = self.root / "index.html"
+        if index.is_file():
+            data = index.read_bytes()
+            self._index["identity"] = (data, _etag(data))
+            for enc, suffix in ENCODINGS:
+                pre = index.with_name(index.name + suffix)
+                if pre.is_file():
+                    packed = pre.read_bytes()
+                elif enc == "gzip" or brotli is not None:
+                    packed = _compress(data, enc)
+                else:
+                    continue
+                self._index[enc] = (packed, _etag(packed))
+
+        assets_dir = self.root / "assets"
+        if not assets_dir.is_dir():
+            return
+        suffixes = {suffix: enc for enc, suffix in ENCODINGS}
+        for path in assets_dir.rglob("*"):
+            if not path.is_file():
+                continue
+            rel = path.relative_to(assets_dir).as_posix()
+            enc = suffixes.get(path.suffix)
+            if enc is not None:
+                rel = rel[: -len(path.suffix)]
+            else:
+                enc = "identity"
+            asset = self._assets.get(rel)
+            if asset is None:
+                asset = self._assets[rel] = _Asset(media_type=guess_type(rel)[0] or "application/octet-stream")
+            asset.variants[enc] = _Variant(path=path, stat=path.stat(), etag=_etag(path.read_bytes()))
+        # drop orphaned .gz/.br files without an original
+        self._assets = {k: v for k, v in self._assets.items() if "identity" in v.variants}
+
+    def _pick(self, request: Request, available) -> str:
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        for enc, _ in ENCODINGS:
+            if enc in available and enc in accepted:
+                return enc
+        return "identity"
+
+    @staticmethod
+    def _not_modified(request: Request, etag: str) -> bool:
+        inm = request.headers.get("if-none-match")
+        if not inm:
+            return False
+        tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        return f'"{etag}"' in tags or "*" in tags
+
+    @staticmethod
+    def _headers(etag: str, enc: str, cache_control: str) -> dict[str, str]:
+        headers = {"ETag": f'"{etag}"', "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+        return headers
+
+    def index_response(self, request: Request) -> Response:
+        enc = self._pick(request, self._index)
+        data, etag = self._index[enc]
+        headers = self._headers(etag, enc, REVALIDATE)
+        if self._not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=data, media_type="text/html", headers=headers)
+
+    def asset_response(self, request: Request, rel: str) -> Optional[Response]:
+        asset = self._assets.get(rel)
+        if asset is None:
+            return None
+        enc = self._pick(request, asset.variants)
+        v = asset.variants[enc]
+        headers = self._headers(v.etag, enc, IMMUTABLE)
+        if self._not_modified(request, v.etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(str(v.path), media_type=asset.media_type, headers=headers, stat_result=v.stat)
+
+if __name__ == "__main__":
+    # Build step: python -m removarr.static_files <dist dir>
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "static"
+    print(f"precompressed {precompress(target)} files in {target}")
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+import cProfile
+import heapq
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration: float = 0.0
+
+@dataclass
+class Trace:
+    name: str
+    ts: float
+    attrs: dict[str, Any]
+    start: float
+    duration: float = 0.0
+    spans: list[Span] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "ts": self.ts,
+            "attrs": self.attrs,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": [
+                {
+                    "name": s.name,
+                    "offset_ms": round((s.start - self.start) * 1000, 3),
+                    "duration_ms": round(s.duration * 1000, 3),
+                }
+                for s in self.spans
+            ],
+        }
+
+_current: ContextVar[Optional[Trace]] = ContextVar("removarr_trace", default=None)
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    # No-op outside of a trace, so helpers can be instrumented unconditionally.
+    tr = _current.get()
+    if tr is None:
+        yield
+        return
+    s = Span(name=name, start=time.perf_counter())
+    try:
+        yield
+    finally:
+        s.duration = time.perf_counter() - s.start
+        tr.spans.append(s)
+
+def record_span(name: str, start: float, duration: float) -> None:
+    """Add an already-measured span, for work that can't sit inside one `with span()`
+    (e.g. a generator whose time between yields belongs to the caller)."""
+    tr = _current.get()
+    if tr is not None:
+        tr.spans.append(Span(name=name, start=start, duration=duration))
+
+class TraceStore:
+    """Keeps the slowest `keep` traces seen since startup."""
+
+    def __init__(self, keep: int = 25):
+        self._keep = keep
+        self._heap: list[tuple[float, int, Trace]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name: str, **attrs: Any) -> Iterator[Trace]:
+        tr = Trace(name=name, ts=time.time(), attrs=attrs, start=time.perf_counter())
+        tok = _current.set(tr)
+        try:
+            yield tr
+        finally:
+            _current.reset(tok)
+            tr.duration = time.perf_counter() - tr.start
+            self._record(tr)
+
+    def _record(self, tr: Trace) -> None:
+        if self._keep <= 0:
+            return
+        entry = (tr.duration, next(self._seq), tr)
+        with self._lock:
+            if len(self._heap) < self._keep:
+                heapq.heappush(self._heap, entry)
+            elif tr.duration > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self) -> list[dict]:
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [tr.to_dict() for _, _, tr in entries]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+
+class ProfileCapture:
+    """One-at-a-time cProfile capture window.
+
+    The profiler is enabled on the calling thread only, i.e. the event loop thread
+    when started from an async endpoint. Work handed to executor threads (Fernet,
+    PMS searches, Discover calls, cluster requests) does not show up; use the
+    traces for those.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if not self._lock.acquire(blocking=False):
+            return None
+        prof = cProfile.Profile()
+        prof.enable()
+        return prof
+
+    def stop(self, prof: cProfile.Profile) -> None:
+        try:
+            prof.disable()
+        finally:
+            self._lock.release()
+
+def pstats_bytes(prof: cProfile.Profile) -> bytes:
+    # Same on-disk format as Profile.dump_stats(); load with pstats.Stats(path).
+    prof.create_stats()
+    return marshal.dumps(prof.stats)
+
+def pstats_text(prof: cProfile.Profile, sort: str = "cumulative", limit: int = 60) -> str:
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats(sort).print_stats(limit)
+    return buf.getvalue()
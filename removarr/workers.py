@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import asyncio
+import multiprocessing
+import threading
+
+from .auth import verify_password
+from .crypto import Crypto
+
+class Busy(Exception):
+    """Raised when too many password checks are already queued."""
+
+def _decrypt_many(crypto: Crypto, ciphertexts: list[str]) -> list[str | Exception]:
+    out: list[str | Exception] = []
+    for c in ciphertexts:
+        try:
+            out.append(crypto.decrypt(c))
+        except Exception as e:
+            out.append(e)
+    return out
+
+class CryptoExecutor:
+    """Dedicated pools for CPU-bound crypto, kept apart from FastAPI's shared threadpool.
+
+    PBKDF2 runs in a small process pool (it holds the GIL for the whole derivation);
+    Fernet runs in its own thread pool. Pools are created lazily on first use.
+    """
+
+    def __init__(self, hash_workers: int = 1, fernet_threads: int = 2, max_pending_hashes: int = 4):
+        self._hash_workers = max(1, hash_workers)
+        self._fernet_threads = max(1, fernet_threads)
+        self._hash_slots = threading.BoundedSemaphore(max(1, max_pending_hashes))
+        self._hash_pool: Optional[ProcessPoolExecutor] = None
+        self._fernet_pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _hashes(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._hash_pool is None:
+                # spawn: forking a process that already runs threads is unsafe
+                self._hash_pool = ProcessPoolExecutor(
+                    max_workers=self._hash_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._hash_pool
+
+    def _fernet(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._fernet_pool is None:
+                self._fernet_pool = ThreadPoolExecutor(
+                    max_workers=self._fernet_threads, thread_name_prefix="removarr-fernet"
+                )
+            return self._fernet_pool
+
+    async def verify_password(self, password: str, stored: str) -> bool:
+        if not self._hash_slots.acquire(blocking=False):
+            raise Busy("Too many login attempts in progress")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._hashes(), verify_password, password, stored)
+        finally:
+            self._hash_slots.release()
+
+    async def decrypt_many(self, crypto: Crypto, ciphertexts: list[str]) -> list[str | Exception]:
+        # One executor hop per batch; failures are returned in place, not raised.
+        if not ciphertexts:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._fernet(), _decrypt_many, crypto, ciphertexts)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._hash_pool is not None:
+                self._hash_pool.shutdown(wait=False, cancel_futures=True)
+                self._hash_pool = None
+            if self._fernet_pool is not None:
+                self._fernet_pool.shutdown(wait=False, cancel_futures=True)
+                self._fernet_pool = None
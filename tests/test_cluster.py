@@ -0,0 +1,223 @@
+"""Cluster sharding: the hash ring, partitioning, and coordinator fan-out/merge.
+
+The fan-out tests run two full app instances against one SQLite file, with node A's
+shard requests delivered to node B in-process.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+
+import pytest
+import requests
+from cryptography.fernet import Fernet
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from removarr.cluster import Cluster, HashRing
+from removarr.config import Settings
+from removarr.main import create_app
+from removarr.models import PendingRemoval, PlexAccount
+
+NODE_A = "http://node-a:8765"
+NODE_B = "http://node-b:8765"
+WEBHOOK = {"X-Removarr-Webhook-Token": "hook"}
+DOWNLOAD = {"eventType": "Download", "movie": {"tmdbId": 603, "title": "The Matrix", "year": 1999}}
+GRAB = {**DOWNLOAD, "eventType": "Grab"}
+
+def test_ring_spreads_keys_and_moves_only_the_removed_nodes_share():
+    nodes = ["http://a", "http://b", "http://c"]
+    ring = HashRing(nodes)
+    keys = [f"account:{i}" for i in range(3000)]
+    owners = {k: ring.owner(k) for k in keys}
+
+    counts = Counter(owners.values())
+    assert set(counts) == set(nodes)
+    assert all(600 < n < 1400 for n in counts.values())
+
+    smaller = HashRing(["http://a", "http://b"])
+    moved = [k for k in keys if owners[k] != smaller.owner(k)]
+    assert moved and all(owners[k] == "http://c" for k in moved)
+
+def test_ring_order_of_nodes_does_not_matter():
+    a = HashRing(["http://a", "http://b", "http://c"])
+    b = HashRing(["http://c", "http://a", "http://b", "http://a"])
+    assert all(a.owner(f"account:{i}") == b.owner(f"account:{i}") for i in range(200))
+
+def test_partition_covers_every_account_once():
+    cluster = Cluster(NODE_A, [NODE_A, NODE_B, "http://node-c:8765"], "secret")
+    assert cluster.enabled
+    shards = cluster.partition(list(range(1, 101)), key=lambda i: i)
+    flat = sorted(i for shard in shards.values() for i in shard)
+    assert flat == list(range(1, 101))
+    assert all(cluster.owner(i) == node for node, shard in shards.items() for i in shard)
+
+def test_cluster_disabled_without_token_or_peers():
+    assert not Cluster(NODE_A, [NODE_A, NODE_B], None).enabled
+    assert not Cluster(NODE_A, [NODE_A], "secret").enabled
+    local = Cluster(NODE_A, [], None)
+    assert local.is_local(1) and local.partition([1, 2], key=lambda i: i) == {NODE_A: [1, 2]}
+
+def _settings(db_url: str, secret: str, node: str) -> Settings:
+    return Settings(
+        REMOVARR_SECRET_KEY=secret,
+        REMOVARR_DB_URL=db_url,
+        REMOVARR_WEBHOOK_TOKEN="hook",
+        REMOVARR_CLUSTER_NODES=[NODE_A, NODE_B],
+        REMOVARR_CLUSTER_SELF=node,
+        REMOVARR_CLUSTER_TOKEN="cluster-secret",
+    )
+
+class _InProcess:
+    """requests.Session stand-in that delivers shard calls to another app's TestClient."""
+
+    def __init__(self, client: TestClient):
+        self.client = client
+
+    def post(self, url, json, headers, timeout):
+        return self.client.post(url, json=json, headers=headers)
+
+    def close(self):
+        pass
+
+class _Failing:
+    def __init__(self, exc: Exception):
+        self.exc = exc
+
+    def post(self, *args, **kwargs):
+        raise self.exc
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def nodes(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'cluster.db'}"
+    secret = Fernet.generate_key().decode()
+    app_a = create_app(_settings(db_url, secret, NODE_A))
+    app_b = create_app(_settings(db_url, secret, NODE_B))
+    with TestClient(app_a) as client_a, TestClient(app_b) as client_b:
+        rt_a, rt_b = app_a.state.rt, app_b.state.rt
+        with rt_a.SessionLocal() as db:
+            for i in range(12):
+                db.add(PlexAccount(label=f"user{i}", token_enc=rt_a.crypto.encrypt(f"token{i}"), auth_method="manual", status="ok"))
+            db.commit()
+            ids = {a.label: a.id for a in db.query(PlexAccount)}
+
+        scanned: list[tuple[str, str]] = []
+        for node, rt in ((NODE_A, rt_a), (NODE_B, rt_b)):
+            def remove(user_token, tmdb_id, tvdb_id, title, year, _node=node):
+                scanned.append((_node, user_token))
+                return False, "Not on watchlist"
+            rt.plex_ops.remove_from_watchlist_if_present = remove
+
+        yield client_a, client_b, rt_a, ids, scanned
+
+def test_coordinator_fans_out_and_merges(nodes):
+    client_a, client_b, rt_a, ids, scanned = nodes
+    rt_a.cluster._session = _InProcess(client_b)
+
+    res = client_a.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK).json()
+
+    assert res["scanned_accounts"] == 12 and len(res["details"]) == 12
+    assert sorted(token for _, token in scanned) == sorted(f"token{i}" for i in range(12))
+    for node, token in scanned:
+        assert rt_a.cluster.owner(ids[token.replace("token", "user")]) == node
+    assert {node for node, _ in scanned} == {NODE_A, NODE_B}
+
+def test_unreachable_owner_is_processed_locally(nodes):
+    client_a, _, rt_a, _, scanned = nodes
+    rt_a.cluster._session = _Failing(requests.ConnectionError("connection refused"))
+
+    res = client_a.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK).json()
+
+    assert res["scanned_accounts"] == 12
+    assert {node for node, _ in scanned} == {NODE_A} and len(scanned) == 12
+    assert any(d.startswith(f"[cluster] {NODE_B} unreachable") for d in res["details"])
+
+def test_slow_owner_is_not_processed_twice(nodes):
+    client_a, _, rt_a, _, scanned = nodes
+    rt_a.cluster._session = _Failing(requests.ReadTimeout("read timed out"))
+
+    res = client_a.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK).json()
+
+    local = [t for n, t in scanned if n == NODE_A]
+    assert len(scanned) == len(local) < 12
+    assert res["scanned_accounts"] == 12
+    assert any(d.startswith(f"[cluster] {NODE_B} failed") for d in res["details"])
+
+def test_shard_endpoint_requires_cluster_token(nodes):
+    _, client_b, _, ids, _ = nodes
+    body = {"account_ids": list(ids.values()), "source": "radarr", "tmdb_id": 603, "title": "The Matrix"}
+    assert client_b.post("/internal/cluster/process", json=body).status_code == 401
+    res = client_b.post("/internal/cluster/process", json=body, headers={"X-Removarr-Cluster-Token": "cluster-secret"})
+    assert res.status_code == 200 and res.json()["scanned_accounts"] == 12
+
+def test_owner_shedding_load_is_processed_locally(nodes):
+    client_a, _, rt_a, _, scanned = nodes
+
+    class _Shedding:
+        def post(self, *args, **kwargs):
+            r = requests.Response()
+            r.status_code, r._content = 503, b'{"detail": "Queue full"}'
+            return r
+
+        def close(self):
+            pass
+
+    rt_a.cluster._session = _Shedding()
+    res = client_a.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK).json()
+
+    assert {node for node, _ in scanned} == {NODE_A} and len(scanned) == 12
+    assert any(d.startswith(f"[cluster] {NODE_B} overloaded (503)") for d in res["details"])
+
+def _wait_prefetched(rt, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while rt.prefetching and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+def _pending_accounts(rt):
+    with rt.SessionLocal() as db:
+        return sorted(db.execute(select(PendingRemoval.account_id)).scalars())
+
+def test_grab_prefetch_is_sharded_like_imports(nodes):
+    client_a, client_b, rt_a, ids, _ = nodes
+    rt_b = client_b.app.state.rt
+    rt_a.cluster._session = _InProcess(client_b)
+    looked_up: list[tuple[str, str]] = []
+    for node, rt in ((NODE_A, rt_a), (NODE_B, rt_b)):
+        def find(token, tmdb_id, tvdb_id, title, year, _node=node):
+            looked_up.append((_node, token))
+            return f"rk-{token}", "tmdb"
+        rt.plex_ops.find_on_watchlist = find
+
+    client_a.post("/webhook/radarr", json=GRAB, headers=WEBHOOK)
+    _wait_prefetched(rt_a)
+
+    assert sorted(token for _, token in looked_up) == sorted(f"token{i}" for i in range(12))
+    for node, token in looked_up:
+        assert rt_a.cluster.owner(ids[token.replace("token", "user")]) == node
+    assert _pending_accounts(rt_a) == sorted(ids.values())  # neither shard replaced the other's rows
+    grab = rt_a.logring.read()[2]
+    assert b'"source":"radarr:grab"' in grab and b'"scanned_accounts":12' in grab
+
+def test_import_on_another_node_discards_a_running_prefetch(nodes):
+    client_a, client_b, rt_a, _, _ = nodes
+    rt_b = client_b.app.state.rt
+    for rt in (rt_a, rt_b):
+        rt.cluster._session = _Failing(requests.ConnectionError("connection refused"))  # each node does it all
+    release = threading.Event()
+
+    def find(token, tmdb_id, tvdb_id, title, year):
+        release.wait(5)
+        return f"rk-{token}", "tmdb"
+    rt_a.plex_ops.find_on_watchlist = find
+
+    client_a.post("/webhook/radarr", json=GRAB, headers=WEBHOOK)
+    assert client_b.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK).json()["scanned_accounts"] == 12
+    release.set()
+    _wait_prefetched(rt_a)
+
+    assert _pending_accounts(rt_a) == []
+    assert b"Import already processed; prefetch result discarded" in rt_a.logring.read()[2]
@@ -0,0 +1,21 @@
+"""Settings validation."""
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+
+from removarr.config import Settings
+
+def _settings(**env) -> Settings:
+    return Settings(REMOVARR_SECRET_KEY="x", **env)
+
+def test_plex_server_names_must_be_unique():
+    with pytest.raises(ValidationError, match="Duplicate Plex server name"):
+        _settings(PLEX_SERVERS=[{"name": "4k", "url": "http://a", "token": "t"}, {"name": "4k", "url": "http://b", "token": "t"}])
+
+def test_default_name_is_taken_by_plex_base_url():
+    extra = [{"name": "default", "url": "http://b", "token": "t"}]
+    with pytest.raises(ValidationError, match="default"):
+        _settings(PLEX_BASE_URL="http://a", PLEX_SERVER_TOKEN="t", PLEX_SERVERS=extra)
+    # without PLEX_BASE_URL the name is free
+    assert [s.name for s in _settings(PLEX_SERVERS=extra).all_plex_servers()] == ["default"]
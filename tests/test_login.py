@@ -0,0 +1,63 @@
+"""Login lockout: keyed on the client address, taken from a forwarded header only via trusted proxies."""
+from __future__ import annotations
+
+import pytest
+from cryptography.fernet import Fernet
+from fastapi.testclient import TestClient
+
+from removarr.auth import LoginThrottle, client_address, create_admin, trusted_networks
+from removarr.config import Settings
+from removarr.main import create_app
+
+PROXIES = trusted_networks(["10.0.0.0/8", "fd00::1"])
+
+@pytest.mark.parametrize("peer, forwarded, expected", [
+    ("203.0.113.7", "198.51.100.1", "203.0.113.7"),             # not a proxy: header ignored
+    ("10.0.0.2", "198.51.100.1", "198.51.100.1"),
+    ("10.0.0.2", "1.1.1.1, 198.51.100.1, 10.0.0.3", "198.51.100.1"),  # spoofed prefix, two proxies
+    ("fd00::1", "2001:db8::5", "2001:db8::5"),
+    ("10.0.0.2", None, "10.0.0.2"),
+    (None, "198.51.100.1", "?"),
+])
+def test_client_address(peer, forwarded, expected):
+    assert client_address(peer, forwarded, PROXIES) == expected
+
+def test_throttle_locks_out_one_key_only():
+    throttle = LoginThrottle(max_failures=2, window_s=60, lockout_s=30)
+    throttle.failure("ip:a")
+    assert throttle.retry_after("ip:a") == 0
+    throttle.failure("ip:a")
+    assert 0 < throttle.retry_after("ip:a") <= 31 and throttle.retry_after("ip:b") == 0
+    throttle.success("ip:a")
+    assert throttle.retry_after("ip:a") == 0
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(Settings(
+        REMOVARR_SECRET_KEY=Fernet.generate_key().decode(),
+        REMOVARR_DB_URL=f"sqlite:///{tmp_path / 'login.db'}",
+        REMOVARR_LOGIN_MAX_FAILURES=2,
+        REMOVARR_TRUSTED_PROXIES=["10.0.0.1"],
+    ))
+    with TestClient(app):
+        with app.state.rt.SessionLocal() as db:
+            create_admin(db, "admin", "right")
+        yield app
+
+def _login(client, password, forwarded=None):
+    headers = {"X-Forwarded-For": forwarded} if forwarded else {}
+    return client.post("/api/auth/login", json={"username": "admin", "password": password}, headers=headers)
+
+def test_lockout_behind_proxy_is_per_forwarded_client(app):
+    proxy = TestClient(app, client=("10.0.0.1", 4000))
+    for _ in range(2):
+        assert _login(proxy, "wrong", "198.51.100.1").status_code == 401
+    locked = _login(proxy, "right", "198.51.100.1")
+    assert locked.status_code == 429 and int(locked.headers["retry-after"]) > 0
+    assert _login(proxy, "right", "198.51.100.2").status_code == 200
+
+def test_forwarded_header_from_untrusted_peer_is_ignored(app):
+    direct = TestClient(app, client=("203.0.113.7", 4000))
+    for i in range(2):
+        assert _login(direct, "wrong", f"198.51.100.{i}").status_code == 401
+    assert _login(direct, "right", "198.51.100.9").status_code == 429
@@ -0,0 +1,85 @@
+"""Versioned event log: deltas by (epoch, since), resets, and the /api/logs ETag."""
+from __future__ import annotations
+
+import json
+
+import pytest
+from cryptography.fernet import Fernet
+from fastapi.testclient import TestClient
+
+from removarr.config import Settings
+from removarr.logring import LogItem, LogRing
+from removarr.main import create_app, require_auth
+
+def _item(i: int) -> LogItem:
+    return LogItem(ts=float(i), source="radarr", title=f"T{i}", year=None, tmdb_id=i, tvdb_id=None,
+                   removed=0, scanned_accounts=1, details=[f"d{i}"])
+
+def _seqs(raw: bytes) -> list[int]:
+    return [x["seq"] for x in json.loads(raw)]
+
+def test_delta_returns_only_newer_entries_newest_first():
+    ring = LogRing(maxlen=5)
+    for i in range(1, 4):
+        ring.add(_item(i))
+
+    version, reset, items = ring.read(1, ring.epoch)
+    assert (version, reset, _seqs(items)) == (3, False, [3, 2])
+    assert ring.read(3, ring.epoch) == (3, False, b"[]")
+
+def test_full_read_is_cached_until_the_next_add():
+    ring = LogRing(maxlen=5)
+    ring.add(_item(1))
+    first = ring.read()[2]
+    assert ring.read()[2] is first and ring.read(None, ring.epoch)[1] is True
+    ring.add(_item(2))
+    assert _seqs(ring.read()[2]) == [2, 1]
+
+@pytest.mark.parametrize("since, epoch", [
+    (1, "other-epoch"),  # restart: old seqs mean nothing now
+    (1, None),           # epoch unknown
+    (9, "same"),         # ahead of us
+    (0, "same"),         # entries 1..2 already fell off the ring
+])
+def test_reset_when_the_delta_cannot_be_trusted(since, epoch):
+    ring = LogRing(maxlen=3)
+    for i in range(1, 6):
+        ring.add(_item(i))
+    version, reset, items = ring.read(since, ring.epoch if epoch == "same" else epoch)
+    assert (version, reset, _seqs(items)) == (5, True, [5, 4, 3])
+
+def test_edge_of_ring_is_still_a_delta():
+    ring = LogRing(maxlen=3)
+    for i in range(1, 6):
+        ring.add(_item(i))
+    assert ring.read(2, ring.epoch)[:2] == (5, False)
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app(Settings(
+        REMOVARR_SECRET_KEY=Fernet.generate_key().decode(),
+        REMOVARR_DB_URL=f"sqlite:///{tmp_path / 'logs.db'}",
+    ))
+    app.dependency_overrides[require_auth] = lambda: None
+    with TestClient(app) as c:
+        yield c, app.state.rt.logring
+
+def test_logs_endpoint_etag_and_deltas(client):
+    c, ring = client
+    ring.add(_item(1))
+
+    full = c.get("/api/logs")
+    body = full.json()
+    assert full.headers["etag"] == f'"{ring.epoch}-1"' and full.headers["cache-control"] == "no-cache"
+    assert body["reset"] is True and body["version"] == 1 and [x["seq"] for x in body["items"]] == [1]
+
+    unchanged = c.get("/api/logs", headers={"If-None-Match": full.headers["etag"]})
+    assert unchanged.status_code == 304 and unchanged.content == b""
+
+    ring.add(_item(2))
+    assert c.get("/api/logs", headers={"If-None-Match": full.headers["etag"]}).status_code == 200
+    delta = c.get(f"/api/logs?since=1&epoch={ring.epoch}").json()
+    assert delta["reset"] is False and [x["seq"] for x in delta["items"]] == [2]
+
+    stale = c.get("/api/logs?since=1&epoch=deadbeef").json()
+    assert stale["reset"] is True and [x["seq"] for x in stale["items"]] == [2, 1]
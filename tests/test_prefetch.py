@@ -0,0 +1,122 @@
+"""Grab prefetch: it must not take import slots, must not run twice for one title,
+and must not leave stale matches behind when the import wins the race."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from removarr.config import Settings
+from removarr.main import create_app, require_auth
+from removarr.models import PendingRemoval, PlexAccount
+
+WEBHOOK = {"X-Removarr-Webhook-Token": "hook"}
+MOVIE = {"tmdbId": 603, "title": "The Matrix", "year": 1999}
+GRAB = {"eventType": "Grab", "movie": MOVIE}
+DOWNLOAD = {"eventType": "Download", "movie": MOVIE}
+
+@pytest.fixture
+def node(tmp_path):
+    settings = Settings(
+        REMOVARR_SECRET_KEY=Fernet.generate_key().decode(),
+        REMOVARR_DB_URL=f"sqlite:///{tmp_path / 'prefetch.db'}",
+        REMOVARR_WEBHOOK_TOKEN="hook",
+        REMOVARR_WEBHOOK_MAX_IN_FLIGHT=1,
+        REMOVARR_WEBHOOK_MAX_QUEUE=0,
+    )
+    app = create_app(settings)
+    with TestClient(app) as client:
+        rt = app.state.rt
+        with rt.SessionLocal() as db:
+            db.add(PlexAccount(label="alice", token_enc=rt.crypto.encrypt("tok"), auth_method="manual", status="ok"))
+            db.commit()
+
+        release = threading.Event()
+        calls = {"find": 0, "remove": [], "scan": 0}
+
+        def find(token, tmdb_id, tvdb_id, title, year):
+            calls["find"] += 1
+            release.wait(5)
+            return "rk603", "tmdb"
+
+        def scan(**kw):
+            calls["scan"] += 1
+            return True, "Removed by TMDB 603"
+
+        rt.plex_ops.find_on_watchlist = find
+        rt.plex_ops.remove_from_watchlist_if_present = scan
+        rt.plex_ops.remove_by_rating_key = lambda token, rk: calls["remove"].append(rk)
+        yield client, rt, release, calls
+        release.set()
+
+def _pending(rt):
+    with rt.SessionLocal() as db:
+        return db.execute(select(PendingRemoval.rating_key)).scalars().all()
+
+def _wait_idle(rt, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while rt.prefetching and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+def test_running_prefetch_does_not_block_imports(node):
+    client, rt, release, calls = node
+    assert client.post("/webhook/radarr", json=GRAB, headers=WEBHOOK).status_code == 200
+
+    res = client.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK)
+    assert res.status_code == 200 and res.json()["removed"] == 1
+
+def test_duplicate_grabs_share_one_prefetch(node):
+    client, rt, release, calls = node
+    first = client.post("/webhook/radarr", json=GRAB, headers=WEBHOOK).json()
+    second = client.post("/webhook/radarr", json=GRAB, headers=WEBHOOK).json()
+    assert "scheduled" in first["details"][0] and "already running" in second["details"][0]
+
+    release.set()
+    _wait_idle(rt)
+    assert calls["find"] == 1 and _pending(rt) == ["rk603"]
+
+def test_prefetch_finishing_after_the_import_saves_nothing(node):
+    client, rt, release, calls = node
+    client.post("/webhook/radarr", json=GRAB, headers=WEBHOOK)
+    client.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK)
+
+    release.set()
+    _wait_idle(rt)
+    assert _pending(rt) == []
+
+    # the next import for the same id scans instead of trusting a stale match
+    client.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK)
+    assert calls["remove"] == [] and calls["scan"] == 2
+
+def test_import_uses_prefetched_match(node):
+    client, rt, release, calls = node
+    release.set()
+    client.post("/webhook/radarr", json=GRAB, headers=WEBHOOK)
+    _wait_idle(rt)
+
+    grab = json.loads(rt.logring.read()[2])[0]
+    assert grab["source"] == "radarr:grab" and grab["scanned_accounts"] == 1
+    assert grab["details"][0] == "Prefetch: on the watchlist of 1 of 1 account(s)"
+
+    res = client.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK).json()
+    assert res["details"] == ["[alice] Removed by TMDB 603 (prefetched on grab)"]
+    assert calls["remove"] == ["rk603"] and calls["scan"] == 0 and _pending(rt) == []
+
+def test_queueing_and_prefetch_limiter_are_visible_in_diagnostics(node):
+    client, rt, release, calls = node
+    client.app.dependency_overrides[require_auth] = lambda: None
+    release.set()
+    client.post("/webhook/radarr", json=GRAB, headers=WEBHOOK)
+    _wait_idle(rt)
+    client.post("/webhook/radarr", json=DOWNLOAD, headers=WEBHOOK)
+
+    traces = {t["name"]: t for t in client.get("/api/debug/traces").json()["items"]}
+    for name in ("webhook.radarr", "prefetch.radarr"):
+        assert traces[name]["spans"][0]["name"] == "admission.wait"
+    stats = client.get("/api/debug/admission").json()
+    assert stats["admitted"] == 1 and stats["prefetch"]["admitted"] == 1
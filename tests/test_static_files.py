@@ -0,0 +1,82 @@
+"""SPA serving: precompressed variants, Accept-Encoding negotiation and cache headers."""
+from __future__ import annotations
+
+import pytest
+from cryptography.fernet import Fernet
+from fastapi.testclient import TestClient
+
+import removarr.main as main
+from removarr.config import Settings
+from removarr.static_files import IMMUTABLE, REVALIDATE, accepted_encodings, brotli, precompress
+
+JS = b"export const answer = 42;\n" * 100  # compressible and above MIN_COMPRESS_SIZE
+INDEX = b"<!doctype html><html><head><title>Removarr</title></head><body><div id=root></div></body></html>"
+
+@pytest.fixture
+def dist(tmp_path):
+    root = tmp_path / "dist"
+    (root / "assets").mkdir(parents=True)
+    (root / "index.html").write_bytes(INDEX)
+    (root / "assets" / "app-1a2b.js").write_bytes(JS)
+    (root / "assets" / "tiny.css").write_bytes(b"a{}")
+    (root / "assets" / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 2000)
+    return root
+
+@pytest.fixture
+def client(dist, tmp_path, monkeypatch):
+    precompress(dist)
+    monkeypatch.setattr(main, "STATIC_DIR", dist)
+    app = main.create_app(Settings(
+        REMOVARR_SECRET_KEY=Fernet.generate_key().decode(),
+        REMOVARR_DB_URL=f"sqlite:///{tmp_path / 'static.db'}",
+    ))
+    with TestClient(app) as c:
+        yield c
+
+def test_precompress_writes_only_worthwhile_variants(dist):
+    written = precompress(dist)
+    assets = dist / "assets"
+    assert (assets / "app-1a2b.js.gz").is_file()
+    assert (assets / "app-1a2b.js.br").is_file() == (brotli is not None)
+    assert not (assets / "tiny.css.gz").exists()  # below MIN_COMPRESS_SIZE
+    assert not (assets / "logo.png.gz").exists()  # not a compressible type
+    assert written == (2 if brotli is not None else 1)
+
+def test_accepted_encodings_honours_q_zero_and_wildcard():
+    assert accepted_encodings("gzip, br;q=0") == {"gzip"}
+    assert accepted_encodings("identity;q=1, *") >= {"br", "gzip"}
+    assert accepted_encodings(None) == set()
+
+@pytest.mark.parametrize("accept, expected", [
+    ("br, gzip", "br" if brotli is not None else "gzip"),
+    ("gzip", "gzip"),
+    ("identity", None),
+])
+def test_asset_variant_follows_accept_encoding(client, accept, expected):
+    r = client.get("/assets/app-1a2b.js", headers={"Accept-Encoding": accept})
+    assert r.status_code == 200
+    assert r.headers.get("content-encoding") == expected
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.headers["cache-control"] == IMMUTABLE
+    assert r.headers["content-type"].startswith(("text/javascript", "application/javascript"))
+    assert r.content == JS  # httpx decodes the precompressed body
+
+def test_index_revalidates_and_answers_304(client):
+    r = client.get("/some/client/route", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200 and r.content == INDEX
+    assert r.headers["cache-control"] == REVALIDATE and r.headers["content-encoding"] == "gzip"
+
+    again = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304 and again.headers["etag"] == r.headers["etag"]
+
+    # the identity variant has its own ETag, so the gzip one doesn't match it
+    plain = client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": r.headers["etag"]})
+    assert plain.status_code == 200 and "content-encoding" not in plain.headers
+
+def test_asset_304_and_unknown_asset(client):
+    r = client.get("/assets/app-1a2b.js", headers={"Accept-Encoding": "gzip"})
+    etag = r.headers["etag"]
+    cached = client.get("/assets/app-1a2b.js", headers={"Accept-Encoding": "gzip", "If-None-Match": f'W/{etag}, "x"'})
+    assert cached.status_code == 304 and cached.headers["cache-control"] == IMMUTABLE
+    assert client.get("/assets/missing.js").status_code == 404
+    assert client.head("/assets/app-1a2b.js").status_code == 200
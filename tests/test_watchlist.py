@@ -0,0 +1,89 @@
+"""Discover watchlist paging against a fake paged endpoint: server-capped pages,
+missing totalSize, early exit and matches on the last page."""
+from __future__ import annotations
+
+import io
+from typing import Optional
+
+import pytest
+
+from removarr.plex_client import PlexOps
+
+def _entry(i: int) -> str:
+    return (f'<Video ratingKey="rk{i}" title="Movie {i}" year="2000" guid="plex://movie/{i}">'
+            f'<Guid id="tmdb://{1000 + i}"/></Video>')
+
+class _Response:
+    def __init__(self, body: bytes):
+        self.raw = io.BytesIO(body)
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class _Discover:
+    """requests.Session stand-in serving `n` entries, at most `cap` per page."""
+
+    def __init__(self, n: int, cap: Optional[int] = None, total: bool = True):
+        self.n, self.cap, self.total = n, cap, total
+        self.pages: list[tuple[int, int]] = []  # (start, size) as requested
+        self.responses: list[_Response] = []
+        self.removed: list[str] = []
+
+    def get(self, url, params, timeout, stream):
+        start, size = int(params["X-Plex-Container-Start"]), int(params["X-Plex-Container-Size"])
+        self.pages.append((start, size))
+        end = min(self.n, start + min(size, self.cap or size))
+        total = f' totalSize="{self.n}"' if self.total else ""
+        body = f'<MediaContainer size="{end - start}"{total}>' + "".join(_entry(i) for i in range(start, end)) + "</MediaContainer>"
+        self.responses.append(_Response(body.encode()))
+        return self.responses[-1]
+
+    def put(self, url, params, timeout):
+        self.removed.append(params["ratingKey"])
+        return _Response(b"")
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def ops():
+    ops = PlexOps([], watchlist_page_size=5)
+    yield ops
+    ops.close()
+
+def _find(ops, i):
+    return ops.find_on_watchlist("tok", 1000 + i, None, f"Movie {i}", 2000)
+
+def test_server_capped_page_size_follows_total_size(ops):
+    ops._discover_session = fake = _Discover(n=7, cap=2)
+    assert _find(ops, 6) == ("rk6", "tmdb")
+    assert fake.pages == [(0, 5), (2, 5), (4, 5), (6, 5)]
+
+def test_without_total_size_a_short_page_ends_the_list(ops):
+    ops._discover_session = fake = _Discover(n=12, total=False)
+    assert _find(ops, 11) == ("rk11", "tmdb")
+    assert fake.pages == [(0, 5), (5, 5), (10, 5)]
+
+    ops._discover_session = fake = _Discover(n=10, total=False)
+    assert _find(ops, 42) is None
+    assert fake.pages == [(0, 5), (5, 5), (10, 5)]  # full last page: one empty page confirms the end
+
+def test_early_match_stops_paging_and_closes_the_stream(ops):
+    ops._discover_session = fake = _Discover(n=20)
+    assert _find(ops, 1) == ("rk1", "tmdb")
+    assert fake.pages == [(0, 5)] and fake.responses[0].closed
+
+def test_remove_hit_on_last_page(ops):
+    ops._discover_session = fake = _Discover(n=13)
+    assert ops.remove_from_watchlist_if_present("tok", 1012, None, "Movie 12", 2000) == (True, "Removed by TMDB 1012")
+    assert fake.removed == ["rk12"] and len(fake.pages) == 3
+    assert all(r.closed for r in fake.responses)
+
+def test_not_on_watchlist(ops):
+    ops._discover_session = fake = _Discover(n=6, cap=4)
+    assert ops.remove_from_watchlist_if_present("tok", 5, None, "Other", 1999) == (False, "Not on watchlist")
+    assert fake.pages == [(0, 5), (4, 5)] and fake.removed == []
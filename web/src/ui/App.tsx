@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react'
 import {
-  addAccount, deleteAccount, health, info, listAccounts, logs,
+  addAccount, deleteAccount, health, info, listAccounts, logs, resetLogs,
   type Account, type LogsItem, authStatus, setupAdmin, login, logout,
   oauthStart, oauthStatus, authPing, getWebhookToken, regenerateWebhookToken
 } from './api'
@@ -129,6 +129,7 @@ async function onLogout() {
       setInfoState(null)
       setAccounts([])
       setLogItems([])
+      resetLogs()
     } catch (e: any) {
       setErr(String(e?.message || e))
     }
@@ -391,8 +392,8 @@ async function onLogout() {
                 <tbody>
                   {logItems.length === 0 ? (
                     <tr><td colSpan={4} className="small">Brak logów. Wyślij testowy webhook z Radarr/Sonarr.</td></tr>
-                  ) : logItems.slice(0, 12).map((x, idx) => (
-                    <tr key={idx}>
+                  ) : logItems.slice(0, 12).map((x) => (
+                    <tr key={x.seq}>
                       <td className="mono">{tsToLocal(x.ts)}</td>
                       <td className="mono">{x.source}</td>
                       <td>
@@ -9,6 +9,7 @@ export type Account = {
 }
 
 export type LogsItem = {
+  seq: number
   ts: number
   source: string
   title: string
@@ -88,8 +89,27 @@ export async function deleteAccount(id: number): Promise<void> {
   await jfetch(`/api/accounts/${id}`, { method: 'DELETE' })
 }
 
+type LogsPage = { epoch: string; version: number; maxlen: number; reset: boolean; items: LogsItem[] }
+
+// Local copy of the server's log; each poll only asks for entries newer than `version`
+// of the same `epoch` (the server answers reset=true with the full list otherwise).
+let logState: { epoch: string; version: number; items: LogsItem[] } | null = null
+
+export function resetLogs() {
+  logState = null
+}
+
 export async function logs(): Promise<{ items: LogsItem[] }> {
-  return jfetch('/api/logs')
+  const page: LogsPage = await jfetch(
+    logState ? `/api/logs?since=${logState.version}&epoch=${encodeURIComponent(logState.epoch)}` : '/api/logs',
+  )
+  const items = page.reset || !logState
+    ? page.items
+    : page.items.length
+      ? [...page.items, ...logState.items].slice(0, page.maxlen)
+      : logState.items
+  logState = { epoch: page.epoch, version: page.version, items }
+  return { items }
 }
 
 export async function oauthStart(): Promise<{ flow_id: string; url: string }> {